@@ -1,8 +1,11 @@
 from asyncio.events import AbstractEventLoop
 import configparser
+import functools
 import os
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Union, TYPE_CHECKING
+from typing import Callable, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from weakref import WeakValueDictionary
 
 from flowfish.builtins import get, map_simpleeval, run
 from flowfish.error import FlowError
@@ -15,6 +18,65 @@ if TYPE_CHECKING:
 
 __all__ = ['flow', 'FlowError']
 
+_INI_PATHS = tuple(os.path.expanduser(ini_file) for ini_file in (
+    '.flowconfig', '.flow/config', '~/.flowconfig', '~/.config/flow/config'))
+
+_SETTINGS_CACHE: Dict[Tuple, Dict[str, str]] = dict()
+
+
+def _read_flow_section(ini_files: List[str]) -> Dict[str, str]:
+    """read [flow] section of ini files (later files override earlier ones)"""
+    settings = configparser.ConfigParser()
+    settings.read(ini_files)
+    return dict(settings['flow']) if settings.has_section('flow') else dict()
+
+
+def _load_settings() -> Dict[str, str]:
+    """read settings files, reuse parsed settings unless files have changed"""
+    key = []
+    for ini_file in _INI_PATHS:
+        try:
+            st = os.stat(ini_file)
+        except OSError:
+            continue
+        key.append((os.path.abspath(ini_file), st.st_mtime_ns))
+
+    settings = _SETTINGS_CACHE.get(tuple(key))
+    if settings is None:
+        settings = _read_flow_section([ini_file for ini_file, _ in key])
+        _SETTINGS_CACHE[tuple(key)] = settings
+    return settings
+
+
+def _expand_path(path: Union[Path, str]) -> Path:
+    # Path objects without "~" need no expansion
+    if isinstance(path, Path) and not str(path).startswith('~'):
+        return path
+    return _expand_user(str(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _expand_user(path: str) -> Path:
+    return Path(path).expanduser()
+
+
+_BUILTIN_FUNCS = dict(get=Func('get', get),
+                      map=Func('map', map_simpleeval),
+                      run=Func('run', run))
+
+# function wrappers by (name, id), a wrapper keeps its function (and so its id) alive
+_FUNC_CACHE: 'WeakValueDictionary[Tuple[str, int], Func]' = WeakValueDictionary()
+
+
+def _wrap_func(name: str, func: Callable) -> Func:
+    """wrap function, reuse wrappers of flows that are still alive"""
+    key = (name, id(func))
+    wrapper = _FUNC_CACHE.get(key)
+    if wrapper is None or wrapper.func is not func:
+        wrapper = Func(name, func)
+        _FUNC_CACHE[key] = wrapper
+    return wrapper
+
 
 def flow(conf: Union[Path, str, Dict, List[Union[Path, str, Dict]]], props: Optional[Dict] = None,
          data_dir: Optional[Union[Path, str]] = None,
@@ -45,35 +107,31 @@ def flow(conf: Union[Path, str, Dict, List[Union[Path, str, Dict]]], props: Opti
     """
 
     # read settings file
-    settings = configparser.ConfigParser()
-    settings.read([os.path.expanduser(ini_file) for ini_file in (
-        '.flowconfig', '.flow/config', '~/.flowconfig', '~/.config/flow/config')])
+    settings = _load_settings()
 
     # read data_dir/sync_dir from settings file
     if data_dir is None:
         data_dir = os.environ.get('FLOW_DATA_DIR')
         if data_dir is None:
-            data_dir = settings.get('flow', 'data_dir', fallback='.')
+            data_dir = settings.get('data_dir', '.')
 
     if sync_dir is None:
         sync_dir = os.environ.get('FLOW_SYNC_DIR')
         if sync_dir is None:
-            sync_dir = settings.get('flow', 'sync_dir', fallback=None)
+            sync_dir = settings.get('sync_dir')
 
     # ensure Path object
     if data_dir is not None:
-        data_dir = Path(data_dir).expanduser()
+        data_dir = _expand_path(data_dir)
 
     if sync_dir is not None:
-        sync_dir = Path(sync_dir).expanduser()
+        sync_dir = _expand_path(sync_dir)
 
     assert data_dir is not None and isinstance(data_dir, Path), "data_dir missing"
     assert sync_dir is None or isinstance(sync_dir, Path), "sync_dir missing"
 
-    funcs = dict((k, Func(k, v)) for k, v in funcs.items()) if funcs else dict()
-    funcs.update(get=Func('get', get),
-                 map=Func('map', map_simpleeval),
-                 run=Func('run', run))
+    funcs = dict((k, _wrap_func(k, v)) for k, v in funcs.items()) if funcs else dict()
+    funcs.update(_BUILTIN_FUNCS)
 
     cache = dict()
     locks = KeyedLocks()
@@ -82,11 +140,12 @@ def flow(conf: Union[Path, str, Dict, List[Union[Path, str, Dict]]], props: Opti
 
     if isinstance(conf, (Path, str)):
         return flux.load_flow(conf, props=props)
-    else:
-        if type(conf) is list:
-            conf = _merge_confs(flux, conf, props)
-        assert isinstance(conf, Dict)
+    elif type(conf) is list:
+        return flux.make_flow(_merge_confs(flux, conf, props), props=props)
+    elif isinstance(conf, dict):
         return flux.make_flow(conf, props=props)
+    else:
+        raise FlowError(f'conf must be dict and not {type(conf)}')
 
 
 def _merge_confs(flux: Flux, confs: List[Union[Path, str, Dict]], props: Optional[Dict]):
@@ -97,11 +156,13 @@ def _merge_confs(flux: Flux, confs: List[Union[Path, str, Dict]], props: Optiona
             file = conf
             _, conf = flux.load_conf(conf, props)
             for scope_name in conf:
-                if scope_name.startswith('#') or scope_name.startswith('_'):
+                if scope_name.startswith(('#', '_')):
                     continue
                 if '@' in scope_name:
                     scope_name, _ = scope_name.split('@', 1)
-                scope_link = f'{scope_name}@{file}#{scope_name}'
+                    scope_name = sys.intern(scope_name)
+                # interned, the links are used as keys by all later lookups
+                scope_link = sys.intern(f'{scope_name}@{file}#{scope_name}')
                 scopes[scope_name] = scope_link
                 new_conf[scope_link] = dict()
         elif type(conf) is dict:
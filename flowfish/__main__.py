@@ -1,13 +1,13 @@
 import argparse
-import configparser
 import logging
 import os
 from pathlib import Path
 import sys
 import time
-from typing import Iterator, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from flowfish import flow, TYPE_CHECKING
+from flowfish import _expand_path, _load_settings
 from flowfish.logger import logger
 from flowfish.tools import flow_prune
 
@@ -18,6 +18,9 @@ if TYPE_CHECKING:
     from flowfish.node import Node
 
 
+# job dirs modified within this period are always scanned
+_MTIME_SLACK_NS = 2_000_000_000
+
 __FISH__ = "><\u001b[31;1m(\u001b[33;1m(\u001b[32;1m(\u001b[34;1m(\u001b[35;1m'\u001b[0m>"
 
 # configure loguru
@@ -78,16 +81,31 @@ def flow_run(data_dir, sync_dir, conf_files, names, agent=None):
                             logger.error(f'{conf_file}#{node.scope}.{node.name} failed')
 
 
-def find_job(job, data_dir, sync_dir) -> Iterator[Tuple[Path, 'Node']]:
-    if sync_dir is None or not sync_dir.is_dir():
-        raise Exception('sync_dir must exist')
-
-    for base_dir in sync_dir.iterdir():
-        if base_dir.is_dir():
-            jobs_dir = base_dir / '.jobs'
-            if jobs_dir.is_dir():
-                for job_file in jobs_dir.glob(f'*.{job}.json'):
-                    if job_file.is_file():
+def find_job(job, data_dir, sync_dir, mtimes: Optional[Dict[str, int]] = None) -> Iterator[Tuple[Path, 'Node']]:
+    # sync_dir is checked by the caller
+    suffix = f'.{job}.json'
+    with os.scandir(sync_dir) as base_dirs:
+        for base_dir in base_dirs:
+            if not base_dir.is_dir():
+                continue
+            jobs_dir = os.path.join(base_dir.path, '.jobs')
+            try:
+                mtime = os.stat(jobs_dir).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if mtimes is not None:
+                # skip unchanged job dirs (unless modified recently, mtimes may be coarse)
+                if mtimes.get(jobs_dir) == mtime and time.time_ns() - mtime > _MTIME_SLACK_NS:
+                    continue
+                mtimes[jobs_dir] = mtime
+            try:
+                job_files = os.scandir(jobs_dir)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with job_files:
+                for entry in job_files:
+                    if entry.name.endswith(suffix) and not entry.name.startswith('.') and entry.is_file():
+                        job_file = Path(entry.path)
                         logger.info(f'job: {job_file.relative_to(sync_dir)} found')
                         slug = '.'.join(job_file.name.split('.')[:2])
                         flow_ = flow(job_file, data_dir=data_dir, sync_dir=sync_dir)
@@ -102,8 +120,9 @@ def flow_agent(agent, data_dir, sync_dir):
         raise Exception('sync_dir must exist')
 
     logger.info(f"{__FISH__} Running...")
+    mtimes: Dict[str, int] = dict()
     while True:
-        for job_file, node in find_job(agent, data_dir, sync_dir):
+        for job_file, node in find_job(agent, data_dir, sync_dir, mtimes):
             node.pull()
             node()
             node.push()
@@ -124,20 +143,18 @@ def main():
             sys.exit(2)
 
     # read settings from flowfish.flowconfig
-    settings = configparser.ConfigParser()
-    settings.read([os.path.expanduser(ini_file) for ini_file in (
-        '.flow/config', '~/.flowconfig', '~/.config/flow/config')])
+    settings = _load_settings()
 
     # flow ... [-d data_dir] [-s sync_dir]
     folder_parser = argparse.ArgumentParser(add_help=False)
     folder_parser.add_argument(
         '-d', '--data-dir', dest='data_dir',
-        default=settings.get('flow', 'data_dir', fallback='.'),
+        default=settings.get('data_dir', '.'),
         help='the data folder (default: %(default)s)'
     )
     folder_parser.add_argument(
         '-s', '--sync-dir', dest='sync_dir',
-        default=settings.get('flow', 'sync_dir', fallback=None),
+        default=settings.get('sync_dir'),
         help='the sync folder (default: %(default)s)'
     )
 
@@ -214,8 +231,8 @@ def main():
         args = flow_parser.parse_args()
 
         # ensure Path object
-        data_dir = Path(args.data_dir).expanduser() if args.data_dir is not None else Path('.')
-        sync_dir = Path(args.sync_dir).expanduser() if args.sync_dir is not None else None
+        data_dir = _expand_path(args.data_dir) if args.data_dir is not None else Path('.')
+        sync_dir = _expand_path(args.sync_dir) if args.sync_dir is not None else None
 
         try:
             if args.command == 'run':
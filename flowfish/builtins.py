@@ -1,12 +1,14 @@
 import builtins
+import functools
 import inspect
 import os
 from typing import Union
 
 import loguru
+import simpleeval
 
-from flowfish.exec import subprocess, Buffer
-from flowfish.utils import find_obj
+from flowfish.exec import _LOOP_POLICY, subprocess, Buffer
+from flowfish.utils import LoopThread, find_obj
 
 
 _MAP_BUILTINS = dict((k, getattr(builtins, k)) for k in (
@@ -16,6 +18,19 @@ _MAP_BUILTINS = dict((k, getattr(builtins, k)) for k in (
     'range', 'reversed', 'round', 'set', 'slice', 'sorted', 'str', 'sum',
     'tuple', 'zip'))
 
+_MAP_FUNCS = dict(_MAP_BUILTINS, get=find_obj)
+
+# event loop shared by all commands
+_LOOP_THREAD = LoopThread(_LOOP_POLICY)
+
+# increase simpleeval limits
+simpleeval.MAX_COMPREHENSION_LENGTH = 0x100000000
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_expr(value: str):
+    return simpleeval.SimpleEval.parse(value)
+
 
 def get(input):
     return find_obj(input)
@@ -23,8 +38,7 @@ def get(input):
 
 def map_simpleeval(input, value='input', **kwargs):
     """map function"""
-    names, funcs = dict(), dict(_MAP_BUILTINS)
-    funcs['get'] = find_obj
+    names, funcs = dict(), dict(_MAP_FUNCS)
 
     for k, v in {'input': input, **kwargs}.items():
         if inspect.isfunction(v) or inspect.ismethod(v) or inspect.isroutine(v):
@@ -32,10 +46,10 @@ def map_simpleeval(input, value='input', **kwargs):
         else:
             names[k] = v
 
-    import simpleeval
-    # increase simpleeval limits
-    simpleeval.MAX_COMPREHENSION_LENGTH = 0x100000000
     expr = simpleeval.EvalWithCompoundTypes(names=names, functions=funcs)
+    # reuse parsed expression (simpleeval>=0.9.12)
+    if hasattr(simpleeval.SimpleEval, 'parse'):
+        return expr.eval(value, previously_parsed=_parse_expr(value))
     return expr.eval(value)
 
 
@@ -64,21 +78,29 @@ def run(_cmd, _args, _shell=False, stdin=None, stdout=None, stderr=None,
         raise TypeError(f'"{_cmd}" is missing arguments: {missing_args}')
 
     # open file streams
-    if stdin and not os.stat(stdin).st_size:
-        raise ValueError('stdin file may not be empty')
-
     stdin_ = open(stdin, 'rb') if stdin else None
-    stdout_ = open(stdout, 'wb') if stdout else None
-    stderr_ = open(stderr, 'wb') if stderr else None
-
-    if _capture:
-        buffer = Buffer(-1 if _capture is True else _capture)
-        stdout_ = buffer
-        stderr_ = buffer
-    else:
-        buffer = None
-
-    ret = subprocess(*cmd, stdin=stdin_, stdout=stdout_, stderr=stderr_, shell=_shell)
+    try:
+        if stdin_ and not os.fstat(stdin_.fileno()).st_size:
+            raise ValueError('stdin file may not be empty')
+
+        stdout_ = open(stdout, 'wb') if stdout else None
+        stderr_ = open(stderr, 'wb') if stderr else None
+        try:
+            if _capture:
+                buffer = Buffer(-1 if _capture is True else _capture)
+                ret = subprocess(*cmd, stdin=stdin_, stdout=buffer, stderr=buffer, shell=_shell,
+                                 loop_thread=_LOOP_THREAD)
+            else:
+                buffer = None
+                ret = subprocess(*cmd, stdin=stdin_, stdout=stdout_, stderr=stderr_, shell=_shell,
+                                 loop_thread=_LOOP_THREAD)
+        finally:
+            for f in (stdout_, stderr_):
+                if f:
+                    f.close()
+    finally:
+        if stdin_:
+            stdin_.close()
 
     if buffer:
         logger = loguru.logger if _logger is None else _logger
@@ -1,5 +1,9 @@
+import ast
+import functools
 import importlib
 import inspect
+import textwrap
+from typing import Any, Dict, Tuple
 
 from cloudpickle.cloudpickle import _extract_code_globals
 
@@ -13,19 +17,63 @@ def _list_globals(func):
     return f_globals
 
 
-def _list_locals(func):
-    class CollectLocals(dict):
-        def __getitem__(self, var):
-            f_locals[var] = obj = main.__dict__[var]
-            return obj
+class _CollectNames(ast.NodeVisitor):
+    """collect names that are loaded when the source is executed"""
+
+    def __init__(self):
+        self.names = dict()  # keep order
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.names[node.id] = None
+
+    def visit_FunctionDef(self, node):
+        # function bodies are not executed on definition, only decorators,
+        # default values and annotations
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns:
+            self.visit(node.returns)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self.visit(node.args)
+
 
-    f_locals = {}
+@functools.lru_cache(maxsize=None)
+def _list_names(code) -> Tuple[str, ...]:
+    collect = _CollectNames()
+    collect.visit(ast.parse(textwrap.dedent(inspect.getsource(code))))
+    return tuple(collect.names)
+
+
+def _list_locals(func):
     main = importlib.import_module('__main__')
-    exec(inspect.getsource(func), CollectLocals())
-    return f_locals
+    return dict((var, main.__dict__[var]) for var in _list_names(func.__code__)
+                if var in main.__dict__)
+
+
+# import statements by (name, id(obj), id(mod)), objects are kept to prevent reuse of their ids
+_IMPORT_CACHE: Dict[Tuple[str, int, int], Tuple[Any, Any, str]] = dict()
+_IMPORT_CACHE_SIZE = 1024
+
+
+def _build_import(name, obj, mod=None):
+    key = (name, id(obj), id(mod))
+    cached = _IMPORT_CACHE.get(key)
+    if cached is not None:
+        return cached[2]
+    statement = _find_import(name, obj, mod)
+    if len(_IMPORT_CACHE) >= _IMPORT_CACHE_SIZE:
+        # drop oldest entry
+        _IMPORT_CACHE.pop(next(iter(_IMPORT_CACHE)), None)
+    _IMPORT_CACHE[key] = (obj, mod, statement)
+    return statement
 
 
-def _build_import(name, obj):
+def _find_import(name, obj, mod=None):
     if inspect.ismodule(obj):
         mod_name, mod_alias = obj.__name__, name
         if mod_name != mod_alias:
@@ -33,7 +81,7 @@ def _build_import(name, obj):
         else:
             return f'import {mod_name}'
     elif inspect.isclass(obj) or inspect.ismethod(obj) or inspect.isfunction(obj):
-        mod = inspect.getmodule(obj)
+        mod = mod or inspect.getmodule(obj)
         if mod:
             mod_name = mod.__name__
             obj_name, obj_alias = obj.__name__, name
@@ -43,7 +91,7 @@ def _build_import(name, obj):
                 return f'from {mod_name} import {obj_name}'
     else:
         # try heuristics and walk down the path
-        mod = inspect.getmodule(obj)
+        mod = mod or inspect.getmodule(obj)
         if mod:
             mod_name = mod.__name__
             mod_path = mod_name.split('.')
@@ -69,7 +117,7 @@ def _build_code(func):
                     imports.update(imports_)
                     sources.extend(sources_)
                 else:
-                    imports.add(_build_import(name, obj))
+                    imports.add(_build_import(name, obj, mod))
             else:
                 raise TypeError(f'"{name}" of type {type(obj)} is ambiguous')
                 # sources.append(f'{name} = {obj}\n')
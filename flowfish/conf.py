@@ -1,28 +1,106 @@
 import inspect
-import json
 import os
 import re
+import sys
 from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
 import cloudpickle
 
 from flowfish.error import FlowError, NodeNotFoundError
 from flowfish.func import Func
 from flowfish.link import Link
-from flowfish.utils import fake_hash, hash32, sorted_dict
+from flowfish.utils import canon_json, fake_hash, hash32, sorted_dict
 
 if TYPE_CHECKING:
     from flowfish.node import Node
 
 
+_LINK_PREFIX_RE = re.compile(r'(@[^@]|&[^&]).*')
+_ESCAPE_RE = re.compile(r'(@@|&&|\$\$).+')
+_ENV_RE = re.compile(r'^\$[\w]+')
+
+
+def _split_link(link: str) -> Tuple[str, Optional[str]]:
+    """split link into source and value, e.g. "foo.bar/baz" -> ("foo.bar", "/baz")"""
+    # the value starts behind the last "#" (if any) and the first char of the source
+    pos = link.rfind('#', 1, len(link) - 1)
+    pos = pos + 2 if pos != -1 else 1
+    ends = [end for end in (link.find(sep, pos) for sep in '/|:') if end != -1]
+    if ends:
+        end = min(ends)
+        return link[:end], link[end:]
+    return link, None
+
+
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+
+def _is_primitive(v) -> bool:
+    """check if value is a tree of JSON primitives"""
+    t = type(v)
+    if t in _PRIMITIVE_TYPES:
+        return True
+    elif t is list or t is tuple:
+        return all(_is_primitive(v_) for v_ in v)
+    elif t is dict:
+        return all(type(k) is str and _is_primitive(v_) for k, v_ in v.items())
+    return False
+
+
+def _copy_primitive(v):
+    t = type(v)
+    if t is dict:
+        return dict((k, _copy_primitive(v_)) for k, v_ in v.items())
+    elif t is list or t is tuple:
+        return [_copy_primitive(v_) for v_ in v]
+    return v
+
+
+def _pickled_by_reference(v) -> bool:
+    """check if cloudpickle dumps object by reference (and not by value, e.g. functions of __main__)"""
+    if inspect.ismodule(v):
+        return v.__name__ != '__main__' and sys.modules.get(v.__name__) is v
+    module = getattr(v, '__module__', None)
+    if not module or module == '__main__':
+        return False
+    # must be importable by its qualified name (e.g. no local functions)
+    obj = sys.modules.get(module)
+    for name in getattr(v, '__qualname__', '').split('.'):
+        obj = getattr(obj, name, None)
+    return obj is v
+
+
+# hashes of importable functions, classes and modules (their dump only depends on identity)
+_HASH_CACHE: 'WeakKeyDictionary[Any, str]' = WeakKeyDictionary()
+
+
 class StopRewrite(Exception):
     pass
 
 
+def _store(out: Union[Dict, List], k, v):
+    if type(out) is dict:
+        out[k] = v
+    else:
+        out.append(v)
+
+
 class Rewrite:
 
+    # copy nested trees of primitives without rewriting (only if rewrite hooks leave them unchanged)
+    _skip_primitives = False
+
     def __init__(self, max_depth=-1):
         self._max_depth = max_depth
+        # dispatch by exact type, subclasses fall back to isinstance checks
+        self._dispatch = {
+            str: self.rewrite_str,
+            type(None): self.rewrite_none,
+            bool: self.rewrite_bool,
+            int: self.rewrite_int,
+            float: self.rewrite_float,
+        }
 
     def discard_item(self, k, v: Any, depth: int, parent=None):
         return False
@@ -31,30 +109,71 @@ class Rewrite:
         return self._rewrite(None, v, depth=0)
 
     def _rewrite(self, k: Optional[str], v: Any, depth: int):
+        # walk the tree with an explicit stack of open containers instead of recursion,
+        # containers are rewritten (post-order) when all their items are done
+        out = []
+        stack = []
+        self._enter(k, v, depth, out, stack)
+        while stack:
+            k, v, depth, items, new, parent = stack[-1]
+            for item in items:
+                if type(new) is dict:
+                    k_, v_ = item
+                    if self.discard_item(k_, v_, depth+1, v):
+                        continue
+                    if k_[:1] == '#':
+                        new[k_] = v_
+                        continue
+                else:
+                    k_, v_ = k, item
+                if self._enter(k_, v_, depth+1, new, stack):
+                    break
+            else:
+                stack.pop()
+                try:
+                    if type(new) is dict:
+                        new = self.rewrite_dict(k, new, depth)
+                    else:
+                        new = self.rewrite_list(k, new, depth)
+                except StopRewrite:
+                    new = None
+                _store(parent, k, new)
+        return out[0]
+
+    def _enter(self, k, v: Any, depth: int, out: Union[Dict, List], stack: List) -> bool:
+        """rewrite leaf into out or push container to stack (returns True)"""
         if self._max_depth != -1 and depth > self._max_depth:
-            return v
-
-        try:
-            if isinstance(v, str):
-                return self.rewrite_str(k, v, depth)
-            elif v is None:
-                return self.rewrite_none(k, v, depth)
-            elif v is True:
-                return self.rewrite_bool(k, v, depth)
-            elif v is False:
-                return self.rewrite_bool(k, v, depth)
+            _store(out, k, v)
+            return False
+
+        t = type(v)
+        rewrite = self._dispatch.get(t)
+        if rewrite is None:
+            if t is dict or t is list or t is tuple:
+                if self._skip_primitives and depth > 0 and _is_primitive(v):
+                    _store(out, k, _copy_primitive(v))
+                    return False
+            elif isinstance(v, str):
+                rewrite = self.rewrite_str
             elif isinstance(v, int):
-                return self.rewrite_int(k, v, depth)
+                rewrite = self.rewrite_int
             elif isinstance(v, float):
-                return self.rewrite_float(k, v, depth)
-            elif isinstance(v, (list, tuple)):
-                return self.rewrite_list(k, self._rewrite_list(k, v, depth), depth)
-            elif isinstance(v, dict):
-                return self.rewrite_dict(k, self._rewrite_dict(k, v, depth), depth)
-            else:
-                return self.rewrite_object(k, v, depth)
+                rewrite = self.rewrite_float
+            elif not isinstance(v, (list, tuple, dict)):
+                rewrite = self.rewrite_object
+            if rewrite is None:
+                if isinstance(v, (list, tuple)):
+                    stack.append((k, v, depth, iter(v), list(), out))
+                else:
+                    stack.append((k, v, depth, iter(v.items()), dict(), out))
+                return True
+
+        try:
+            v = rewrite(k, v, depth)
         except StopRewrite:
-            pass
+            v = None
+        _store(out, k, v)
+        return False
 
     def rewrite_none(self, k, v, depth):
         return v
@@ -74,29 +193,9 @@ class Rewrite:
     def rewrite_dict(self, k, v: Dict, depth: int):
         return v
 
-    def _rewrite_dict(self, k, v: Dict, depth: int):
-        new_dict = dict()
-        for k_, v_ in v.items():
-            if self.discard_item(k_, v_, depth+1, v):
-                continue
-            try:
-                new_dict[k_] = self._rewrite(k_, v_, depth+1) if not k_.startswith('#') else v_
-            except StopRewrite:
-                pass
-        return new_dict
-
     def rewrite_list(self, k, v: List, depth: int):
         return v
 
-    def _rewrite_list(self, k, v: Union[Tuple, List], depth: int):
-        new_list = list()
-        for v_ in v:
-            try:
-                new_list.append(self._rewrite(k, v_, depth+1))
-            except StopRewrite:
-                pass
-        return new_list
-
     def rewrite_object(self, k, v: Any, depth: int):
         # rewrite "pydantic models" to dict()
         if hasattr(v, 'dict'):
@@ -116,16 +215,16 @@ class RewriteBaseConf(Rewrite):
 
     def discard_item(self, k, v, depth, parent):
         # discard comments if they exist as keys
-        return depth == 1 and k.startswith('#') and k[1:] in parent
+        return depth == 1 and k[:1] == '#' and k[1:] in parent
 
     def rewrite_str(self, k, v, depth):
-        if depth <= 2 and re.match(r'(@[^@]|&[^&]).*', v):
-            m = re.match(r'^([@&])(.+#.+?|.+?)([/|:].*)?$', v)
-            if not m:
+        if depth <= 2 and v[:1] in ('@', '&') and _LINK_PREFIX_RE.match(v):
+            if '\n' in v:
                 crumb = self.target._node_crumb()
                 raise FlowError(f'{crumb}: {k}="{v}" is invalid')
             else:
-                kind, link, value = m.groups()
+                kind = v[0]
+                link, value = _split_link(v[1:])
                 if link == '.':
                     source = self.target
                 else:
@@ -149,7 +248,7 @@ class RewriteNodeConf(Rewrite):
 
     def discard_item(self, k, v, depth, parent):
         # discard comments if they exist as function params
-        return depth == 1 and k.startswith('#') and k[1:] in self.func_defs
+        return depth == 1 and k[:1] == '#' and k[1:] in self.func_defs
 
     def rewrite_dict(self, k, v, depth):
         # extend conf with function defaults
@@ -160,6 +259,8 @@ class RewriteNodeConf(Rewrite):
 
 class StopRewriteObjects(Rewrite):
 
+    _skip_primitives = True
+
     def rewrite_object(self, k, v, depth):
         raise StopRewrite
 
@@ -167,21 +268,23 @@ class StopRewriteObjects(Rewrite):
 class RewriteArgsConf(Rewrite):
     """Create displayable config"""
 
-    def __init__(self, func_defs: Dict):
+    def __init__(self, func_defs: Dict, canon_defs: Optional[Dict] = None):
         super().__init__(max_depth=2)
         self.func_defs = func_defs
-
-    def _json_coerce(self, o):
-        return json.loads(json.dumps(StopRewriteObjects().rewrite(o)))
+        self.canon_defs = canon_defs if canon_defs is not None else dict()
 
     def discard_item(self, k, v, depth, parent):
         # discard comments and internal args
-        if depth == 1 and k.startswith('#') or k.startswith('_'):
+        if depth == 1 and k[:1] == '#' or k[:1] == '_':
             return True
         # discard default args
         if depth == 1 and k in self.func_defs:
             d = self.func_defs[k]
-            return v == d or self._json_coerce(v) == self._json_coerce(d)
+            if v == d:
+                return True
+            if k not in self.canon_defs:
+                self.canon_defs[k] = canon_json(d)
+            return canon_json(v) == self.canon_defs[k]
         return False
 
     def rewrite_dict(self, k, v, depth):
@@ -200,7 +303,7 @@ class RewriteHashConf(Rewrite):
 
     def discard_item(self, k, v, depth, parent):
         # discard comments and internal args
-        return depth == 1 and (k.startswith('#') or k.startswith('_'))
+        return depth == 1 and k[:1] in ('#', '_')
 
     def rewrite_dict(self, k, v, depth):
         # sort_keys = True
@@ -219,16 +322,31 @@ class RewriteHashConf(Rewrite):
                 value += link.value
             return value
         # rewrite objects with hash or system id
+        cachable = (inspect.isroutine(v) or inspect.isclass(v) or inspect.ismodule(v)) and _pickled_by_reference(v)
+        if cachable:
+            try:
+                return _HASH_CACHE[v]
+            except (KeyError, TypeError):
+                pass
         try:
             dump = cloudpickle.dumps(v, protocol=4)
-            return hash32(dump)
+            hash_ = hash32(dump)
         except Exception:
             return fake_hash(v)
+        if cachable:
+            try:
+                _HASH_CACHE[v] = hash_
+            except TypeError:
+                # not weak referenceable
+                pass
+        return hash_
 
 
 class RewriteFlowConf(Rewrite):
     """Create dumpable config"""
 
+    _skip_primitives = True
+
     def discard_item(self, k, v, depth, parent):
         # discard _agent property
         return depth == 1 and k == '_agent'
@@ -253,12 +371,13 @@ class RewriteCallConf(Rewrite):
 
     def discard_item(self, k, v, depth, parent):
         if depth == 1:
-            # keep conversion types
-            if k.startswith('_type.'):
-                return False
-            # discard comments and internal args that are no valid function params
-            if k.startswith('#') or (k.startswith('_') and k not in self.func_pars):
+            c = k[:1]
+            # discard comments
+            if c == '#':
                 return True
+            # discard internal args that are no valid function params (but keep conversion types)
+            if c == '_':
+                return k not in self.func_pars and not k.startswith('_type.')
         return False
 
     def rewrite_dict(self, k, v, depth):
@@ -286,11 +405,11 @@ class RewriteCallConf(Rewrite):
 
     def rewrite_str(self, k, v, depth):
         # rewrite escaped string literals
-        if depth <= 2 and re.match(r'(@@|&&|\$\$).+', v):
+        if depth <= 2 and v[:1] in ('@', '&', '$') and _ESCAPE_RE.match(v):
             return v[1:]
         # rewrite environment variables (fail if not exists)
         if depth == 1 and v.startswith('$'):
-            m = re.match(r'^\$[\w]+', v)
+            m = _ENV_RE.match(v)
             if m:
                 name = m.group()[1:]
                 return os.environ[name] + v[len(m.group()):]
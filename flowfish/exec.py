@@ -1,6 +1,7 @@
 import asyncio
 from asyncio.streams import StreamReader, StreamWriter
 import codecs
+from collections import deque
 import functools
 from io import TextIOBase
 import signal
@@ -8,13 +9,23 @@ import sys
 import threading
 from typing import Callable, Coroutine, IO, Optional, TextIO
 
+try:
+    # Setting a loop_policy workarounds Python Bug 35621 (fixed in 3.8):
+    # asyncio.create_subprocess_exec() only works with main event loop
+    import uvloop
+    _LOOP_POLICY: Optional[asyncio.AbstractEventLoopPolicy] = uvloop.EventLoopPolicy()
+except ImportError:
+    _LOOP_POLICY = None
+
 
 class Buffer(TextIOBase, TextIO):
     """"Carriage return" aware line buffer"""
 
     def __init__(self, max_lines: int = -1):
-        self.lines = []
+        self.lines = deque(maxlen=max_lines) if max_lines > 0 else deque()
         self.max_lines = max_lines
+        # total length of lines
+        self._size = 0
 
     def __call__(self, s: str):
         self.write(s)
@@ -30,50 +41,34 @@ class Buffer(TextIOBase, TextIO):
         return True
 
     def write(self, s: str):
+        lines = self.lines
+
         # merge value with last open line
-        offs = 0
-        if self.lines and self.lines[-1][-1] != '/n':
-            last = self.lines.pop()
-            offs = max(0, len(last) - 1)
+        if lines and lines[-1][-1] != '\n':
+            last = lines.pop()
+            self._size -= len(last)
             s = last + s
 
-        start, end, size = 0, 0, len(s)
-
-        while start < size:
-            end = s.find('\n', start + offs)
-            if end == -1:
-                end = size
-                is_last = True
-                is_open = True
-            else:
-                # include line feed
-                end = end + 1
-                is_last = end == size
-                is_open = False
-
-            # discard everything below last carriage return
-            if is_last and is_open:
-                pos = s.rfind('\r', start + offs, end - 1)
-            else:
-                pos = s.rfind('\r', start + offs, end)
-
-            if pos != -1:
-                start = pos + 1
+        parts = s.split('\n')
+        last = parts.pop()
 
-            if end - start > 0:
-                self.lines.append(s[start:end])
+        # discard everything below last carriage return (keep trailing one of open line)
+        new_lines = [part[part.rfind('\r') + 1:] + '\n' for part in parts]
+        if last:
+            new_lines.append(last[last.rfind('\r', 0, len(last) - 1) + 1:])
 
-            start = end
-            offs = 0
-
-        if self.max_lines > 0:
-            self.lines = self.lines[-self.max_lines:]
+        for line in new_lines:
+            # account for line dropped by maxlen
+            if len(lines) == lines.maxlen:
+                self._size -= len(lines[0])
+            lines.append(line)
+            self._size += len(line)
 
     def __repr__(self):
         return ''.join(self.lines)
 
     def __len__(self):
-        return sum(len(line) for line in self.lines)
+        return self._size
 
 
 def run_async_threaded(func: Callable[[], Coroutine], loop_policy=None):
@@ -90,7 +85,8 @@ def run_async_threaded(func: Callable[[], Coroutine], loop_policy=None):
         await asyncio.gather(*tasks, return_exceptions=True)
         loop.stop()
 
-    # create loop
+    # create loop (prefer uvloop)
+    loop_policy = loop_policy or _LOOP_POLICY
     if loop_policy:
         loop = loop_policy.new_event_loop()
     else:
@@ -122,6 +118,7 @@ def run_async(func: Callable[[], Coroutine], loop_policy=None, use_thread: Optio
     if use_thread:
         return run_async_threaded(func, loop_policy=loop_policy)
     else:
+        loop_policy = loop_policy or _LOOP_POLICY
         if loop_policy:
             loop = loop_policy.new_event_loop()
         else:
@@ -137,7 +134,7 @@ async def async_subprocess(
     stdin: Optional[IO] = None,
     stdout: Optional[IO] = None,
     stderr: Optional[IO] = None,
-    read_limit=2**16, shell=False
+    read_limit=1 << 18, shell=False
 ):
     """
     Execute subprocess asynchronously
@@ -148,44 +145,58 @@ async def async_subprocess(
     """
 
     async def read(stream: StreamWriter, reader: IO):
+        # read whatever is available without blocking the loop
+        loop = asyncio.get_running_loop()
+        read_raw = getattr(reader, 'read1', reader.read)
         if isinstance(reader, TextIOBase):
             encode = codecs.getincrementalencoder(reader.encoding or 'utf-8')(errors='replace').encode
+
+            def read_chunk(n):
+                return encode(read_raw(n))
         else:
-            encode = None
-        while True:
-            chunk = reader.read(read_limit)
-            if encode:
-                value = encode(chunk)
-            else:
-                value = chunk
-            if value:
-                stream.write(value)  # type: ignore
-            if not chunk:
-                break
+            read_chunk = read_raw
+
+        pending = 0
         try:
+            while True:
+                chunk = await loop.run_in_executor(None, read_chunk, read_limit)
+                # stop if the process exited before reading all input (e.g. head)
+                if not chunk or stream.is_closing():
+                    break
+                stream.write(chunk)  # type: ignore
+                # wait for the process to catch up (limits buffered input)
+                pending += len(chunk)
+                if pending > read_limit * 4:
+                    await stream.drain()
+                    pending = 0
             await stream.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
         finally:
             stream.close()
 
     async def write(stream: StreamReader, writer: IO):
         if isinstance(writer, TextIOBase):
             decode = codecs.getincrementaldecoder(writer.encoding or 'utf-8')(errors='replace').decode
+
+            def write_chunk(chunk):
+                value = decode(chunk)
+                if value:
+                    writer.write(value)
         else:
-            decode = None
+            write_chunk = writer.write
+
+        # workaround problem in carriage return handling in IPython
+        wait_flush = hasattr(writer, '_flush_pending')
+
         while True:
             chunk = await stream.read(read_limit)
-            if decode:
-                value = decode(chunk)
-            else:
-                value = chunk
-            if value:
-                writer.write(value)
-                # workaround problem in carriage return handling in IPython
-                if hasattr(writer, '_flush_pending'):
-                    while writer._flush_pending:  # type: ignore
-                        await asyncio.sleep(0)
             if not chunk:
                 break
+            write_chunk(chunk)
+            if wait_flush:
+                while writer._flush_pending:  # type: ignore
+                    await asyncio.sleep(0)
 
     if shell:
         # TODO replace naive str.join() by shlex.join() from 3.8
@@ -209,11 +220,11 @@ async def async_subprocess(
 
     tasks = []
     if process.stdout:
-        tasks.append(write(process.stdout, stdout))
+        tasks.append(asyncio.ensure_future(write(process.stdout, stdout)))
     if process.stderr:
-        tasks.append(write(process.stderr, stderr))
+        tasks.append(asyncio.ensure_future(write(process.stderr, stderr)))
     if process.stdin and stdin is not None:
-        tasks.append(read(process.stdin, stdin))
+        tasks.append(asyncio.ensure_future(read(process.stdin, stdin)))
 
     await asyncio.wait(tasks)
     return await process.wait()
@@ -223,19 +234,22 @@ def subprocess(*cmd,
                stdin: Optional[IO] = None,
                stdout: Optional[IO] = None,
                stderr: Optional[IO] = None,
-               read_limit=2**16, shell=False):
-    try:
-        # Setting a loop_policy workarounds Python Bug 35621 (fixed in 3.8):
-        # asyncio.create_subprocess_exec() only works with main event loop
-        import uvloop
-        loop_policy = uvloop.EventLoopPolicy()
-    except ImportError:
-        loop_policy = asyncio.get_event_loop_policy()
-    return run_async(functools.partial(
+               read_limit=1 << 18, shell=False, loop_thread=None):
+    func = functools.partial(
         async_subprocess, *cmd,
         stdin=stdin,
         stdout=stdout,
         stderr=stderr,
         read_limit=read_limit,
         shell=shell
-    ), loop_policy=loop_policy)
+    )
+    if loop_thread is None:
+        return run_async(func)
+
+    # reuse long-lived loop (see LoopThread)
+    future = loop_thread.submit(func())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
@@ -1,4 +1,3 @@
-import copy
 import json
 from pathlib import Path
 import re
@@ -7,13 +6,16 @@ from typing import Dict, Iterator, List, Optional, Union, TYPE_CHECKING
 from flowfish.error import FlowError
 from flowfish.graph import dot
 from flowfish.scope import Scope
-from flowfish.utils import copy_props, hash32
+from flowfish.utils import clone_conf, copy_props, hash32
 
 
 if TYPE_CHECKING:
     from flowfish.flux import Flux
 
 
+_NAME_RE = re.compile(r'^\w+$', re.ASCII)
+
+
 class Flow:
 
     _scopes: Dict[str, 'Scope']
@@ -24,12 +26,16 @@ class Flow:
         self._props = props
         self._file = file
 
+        # cached results of _hash and _flow_conf() (reset on changes)
+        self._hash_cache: Optional[str] = None
+        self._flow_conf_cache: Optional[Dict] = None
+
         # keep initial conf
-        self._conf = copy.deepcopy(conf)
+        self._conf = clone_conf(conf)
 
         # add scopes
         for scope_name, scope_conf in conf.items():
-            if scope_name.startswith('#') or scope_name.startswith('_'):
+            if scope_name.startswith(('#', '_')):
                 continue
             self._add_scope(scope_name, scope_conf)
 
@@ -43,7 +49,11 @@ class Flow:
 
     @property
     def _hash(self):
-        return hash32('|'.join(sorted(node._slug for scope in self for node in scope)))
+        if self._hash_cache is None:
+            slugs = [node._slug for scope in self for node in scope]
+            slugs.sort()
+            self._hash_cache = hash32('|'.join(slugs))
+        return self._hash_cache
 
     @property
     def _readonly(self) -> bool:
@@ -79,7 +89,7 @@ class Flow:
         elif '_base' not in scope_conf:
             scope_conf['_base'] = scope_name
 
-        if not re.match(r'^\w+$', scope_name, re.ASCII):
+        if not _NAME_RE.match(scope_name):
             crumb = self._scope_crumb(scope_name)
             raise FlowError(f'{crumb}: invalid scope name')
 
@@ -90,19 +100,28 @@ class Flow:
         copy_props(self._props, scope_props, [scope_name])
 
         # copy hidden props to conf
-        hidden_props = dict((k, v) for k, v in scope_props.items()
-                            if k.startswith('_') and k != '_props')
-        copy_props(hidden_props, scope_conf)
+        for k, v in scope_props.items():
+            if k[:1] == '_' and k != '_props':
+                scope_conf[k] = v
 
         scope = Scope(self._flux, self, scope_name, scope_conf, scope_props)
         self._scopes[scope_name] = scope
         setattr(self, scope_name, scope)
+        self._reset_cache()
         return scope
 
+    def _reset_cache(self):
+        self._hash_cache = None
+        self._flow_conf_cache = None
+
     def _setup_flow(self):
         # merge scopes
-        for scope in self._scopes.values():
-            scope._merge_scope()
+        self._flux.merging += 1
+        try:
+            for scope in self._scopes.values():
+                scope._merge_scope()
+        finally:
+            self._flux.merging -= 1
 
         # merge nodes
         for scope in self._scopes.values():
@@ -112,9 +131,11 @@ class Flow:
         for scope in self._scopes.values():
             scope._setup_nodes()
 
+        self._reset_cache()
+
     def _save(self):
         if self._name:
-            if not re.match(r'^\w+$', self._name, re.ASCII):
+            if not _NAME_RE.match(self._name):
                 raise ValueError(f'"_name" contains invalid chars (must be alphanumeric): {self._name}')
             name = self._name
         elif self._file:
@@ -133,20 +154,20 @@ class Flow:
             self._logger.debug(f'flow found, load with "{conf_file.name}"')
         else:
             conf_file.parent.mkdir(exist_ok=True)
-            with open(conf_file, 'w') as f:
-                json.dump(self._flow_conf(), f, sort_keys=True, indent=4)
+            conf_file.write_bytes(json.dumps(self._flow_conf(), sort_keys=True, indent=4).encode())
             self._logger.info(f'flow saved, load with "{conf_file.name}"')
 
     def _flow_conf(self):
+        if self._flow_conf_cache is not None:
+            return self._flow_conf_cache
         flow_conf = dict()
         for scope in self:
             for node in scope:
                 for scope_name, scope_conf in node._flow_conf().items():
-                    if scope_name not in flow_conf:
-                        flow_conf[scope_name] = dict()
+                    new_scope_conf = flow_conf.setdefault(scope_name, dict())
                     for node_name, node_conf in scope_conf.items():
-                        if node_name not in flow_conf[scope_name]:
-                            flow_conf[scope_name][node_name] = node_conf
+                        new_scope_conf.setdefault(node_name, node_conf)
+        self._flow_conf_cache = flow_conf
         return flow_conf
 
     def __iter__(self) -> Iterator['Scope']:
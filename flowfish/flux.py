@@ -1,21 +1,54 @@
 from asyncio.events import AbstractEventLoop
-import copy
 import json
 from pathlib import Path
 import re
-from typing import Dict, Optional, Tuple, Union, TYPE_CHECKING
+from typing import Any, Dict, Optional, Tuple, Union, TYPE_CHECKING
 
 from flowfish.error import FlowError
 from flowfish.flow import Flow
 from flowfish.graph import Graph
 from flowfish.locks import KeyedLocks
 from flowfish.logger import logger
-from flowfish.utils import LoopThread, copy_props
+from flowfish.utils import LoopThread, clone_conf, copy_props
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 if TYPE_CHECKING:
     from flowfish.func import Func
 
 
+# e.g. foo#bar.1234ab
+_NODE_SLUG_RE = re.compile(r'^\w+#\w+\.[a-z0-9]{1,8}$', re.ASCII)
+# e.g. flow.1234ab.json
+_FLOW_SLUG_RE = re.compile(r'^\w+\.[a-z0-9]{1,8}\.json$', re.ASCII)
+
+# contents of conf files (reused while mtime and size are unchanged)
+_CONF_CACHE: Dict[Path, Tuple[int, int, str]] = dict()
+
+
+def _read_conf(conf_file: Path) -> str:
+    st = conf_file.stat()
+    cached = _CONF_CACHE.get(conf_file)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    text = conf_file.read_text()
+    _CONF_CACHE[conf_file] = (st.st_mtime_ns, st.st_size, text)
+    return text
+
+
+def _parse_json(text: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # e.g. NaN written by json.dump()
+            pass
+    return json.loads(text)
+
+
 class Flux:
 
     graph: 'Graph'
@@ -45,6 +78,8 @@ class Flux:
         self.share = share
         self.loop = loop
         self.loop_thread = loop_thread or LoopThread()
+        # number of flows merging their scopes (scopes may still get nodes)
+        self.merging = 0
 
         # bind logger enable one logger per flow
         self.logger = logger.bind(flux=id(self))
@@ -68,12 +103,12 @@ class Flux:
     def load_conf(self, file: Union[Path, str], props: Optional[Dict] = None, relative_to: Optional[Path] = None
                   ) -> Tuple[Path, Dict]:
         # 1.1) try to resolve node relative to data_dir (e.g. foo#bar.1234ab )
-        if isinstance(file, str) and re.match(r'^\w+#\w+\.[a-z0-9]{1,8}$', file, re.ASCII):
+        if isinstance(file, str) and _NODE_SLUG_RE.match(file):
             path, slug = file.split('#')
             conf_file = self.data_dir / path / f'{slug}.json'
 
         # 1.2) try to resolve flow relative to data_dir (e.g. flow.1234ab.json)
-        elif isinstance(file, str) and re.match(r'^\w+\.[a-z0-9]{1,8}\.json$', file, re.ASCII):
+        elif isinstance(file, str) and _FLOW_SLUG_RE.match(file):
             conf_file = self.data_dir / file
 
         # 1.3) try to resolve relative to current working directory
@@ -99,17 +134,17 @@ class Flux:
             if not conf_file.is_file():
                 raise FlowError(f'Flow not found: {file}')
 
-            with open(conf_file, 'r') as f:
-                if conf_file.suffix.lower() in ('.yml', '.yaml'):
-                    try:
-                        import yaml
-                    except ImportError:
-                        raise ImportError(
-                            "PyYAML not installed: "
-                            "pip install pyyaml")
-                    return conf_file, yaml.safe_load(f)
-                else:
-                    return conf_file, json.load(f)
+            text = _read_conf(conf_file)
+            if conf_file.suffix.lower() in ('.yml', '.yaml'):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError(
+                        "PyYAML not installed: "
+                        "pip install pyyaml")
+                return conf_file, yaml.safe_load(text)
+            else:
+                return conf_file, _parse_json(text)
 
     def load_flow(self, file: Union[Path, str], props: Optional[Dict] = None, relative_to: Optional[Path] = None):
         conf_file, conf = self.load_conf(file, props, relative_to)
@@ -118,7 +153,7 @@ class Flux:
         if conf_file in self.flows and not props:
             return self.flows[conf_file]
         else:
-            flow = self.make_flow(conf, props, conf_file)
+            flow = self.make_flow(conf, props, conf_file, owned=True)
 
             # track flow by name, save flow.json to data_dir
             if not flow._readonly:
@@ -126,15 +161,15 @@ class Flux:
 
             return flow
 
-    def make_flow(self, conf: Dict, props: Optional[Dict] = None, file: Optional[Path] = None):
+    def make_flow(self, conf: Dict, props: Optional[Dict] = None, file: Optional[Path] = None, owned: bool = False):
         # Attention: flow must be known to others before setup!
-        flow = self._add_flow(conf, props, file)
+        flow = self._add_flow(conf, props, file, owned)
         flow._setup_flow()
         return flow
 
-    def _add_flow(self, conf: Dict, props: Optional[Dict] = None, file: Optional[Path] = None):
-        # clone original conf before modification
-        flow_conf = copy.deepcopy(conf)
+    def _add_flow(self, conf: Dict, props: Optional[Dict] = None, file: Optional[Path] = None, owned: bool = False):
+        # clone original conf before modification (unless it is owned, e.g. freshly loaded)
+        flow_conf = conf if owned else clone_conf(conf)
 
         # merge props
         flow_props = dict()
@@ -142,9 +177,9 @@ class Flux:
         copy_props(props, flow_props)
 
         # copy hidden props to conf
-        hidden_props = dict((k, v) for k, v in flow_props.items()
-                            if k.startswith('_') and k != '_props')
-        copy_props(hidden_props, flow_conf)
+        for k, v in flow_props.items():
+            if k[:1] == '_' and k != '_props':
+                flow_conf[k] = v
 
         flow = Flow(self, flow_conf, flow_props, file)
 
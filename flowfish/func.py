@@ -5,7 +5,7 @@ from typing import Optional, get_type_hints, Any, Callable, Dict, List, Set, Tup
 
 from flowfish.code import find_code
 from flowfish.logger import logger
-from flowfish.utils import find_obj
+from flowfish.utils import cached_property, find_obj
 
 
 def _find_func(name: str) -> Callable:
@@ -32,47 +32,57 @@ def _func_defs(sign: Signature) -> Dict[str, Any]:
                 if p.default is not p.empty)
 
 
-def _split_args(sign: Signature, *args, **kwargs) -> Tuple[Dict, Dict, Dict, List]:
+class _ParamTables:
+    """parameter lookups of a signature (computed once per function)"""
+
+    def __init__(self, sign: Signature):
+        self.params = sign.parameters
+        self.param_list = list(self.params.values())
+        self.pos_params = [p for p in self.param_list if p.kind in (p.POSITIONAL_OR_KEYWORD, p.POSITIONAL_ONLY)]
+        self.var_params = [p for p in self.param_list if p.kind is p.VAR_POSITIONAL]
+        self.key_params = [p for p in self.param_list if p.kind in (p.KEYWORD_ONLY, p.VAR_KEYWORD)]
+
+
+def _split_args(tables: _ParamTables, args: Tuple, kwargs: Dict) -> Tuple[Dict, Dict, Dict, List]:
     """split given args and kwargs in positional, variadic and keyword arguments"""
     pos_args = dict()
     var_args = dict()
     key_args = dict()
     missing = list()
 
-    params = sign.parameters
-    param_list = list(params.values())
-    param_idcs = dict((p, i) for i, p in enumerate(params))
+    params = tables.params
+    param_list = tables.param_list
 
     # read from *args first to ensure position
-    pos_params = list(filter(lambda p: p.kind in (p.POSITIONAL_OR_KEYWORD, p.POSITIONAL_ONLY),
-                             params.values()))
-
     for i, v in enumerate(args):
-        if i < len(pos_params):
+        if i < len(tables.pos_params):
             pos_args[param_list[i].name] = v
         else:
             var_args[param_list[i].name] = args[i:]
             break
 
-    # read from **kwargs last
-    for k, v in sorted(kwargs.items(), key=lambda i: param_idcs.get(i[0], -1)):
-        if k in params:
-            p = params[k]
-            if p.kind in (p.POSITIONAL_OR_KEYWORD, p.POSITIONAL_ONLY):
-                # do not override pos_args if already set from *args
-                if k not in pos_args:
-                    pos_args[k] = v
-            elif p.kind is p.VAR_POSITIONAL:
-                # do not override var_args if already set from *args
-                if k not in var_args:
-                    if not isinstance(v, (list, tuple)):
-                        raise TypeError(f'Invalid varargs: {type(v)} (must be list)')
-                    var_args[k] = v
-            else:
-                key_args[k] = v
-        else:
+    # read from **kwargs last (in order of params)
+    for k, v in kwargs.items():
+        if k not in params:
             key_args[k] = v
 
+    for p in tables.pos_params:
+        # do not override pos_args if already set from *args
+        if p.name in kwargs and p.name not in pos_args:
+            pos_args[p.name] = kwargs[p.name]
+
+    for p in tables.var_params:
+        # do not override var_args if already set from *args
+        if p.name in kwargs and p.name not in var_args:
+            v = kwargs[p.name]
+            if not isinstance(v, (list, tuple)):
+                raise TypeError(f'Invalid varargs: {type(v)} (must be list)')
+            var_args[p.name] = v
+
+    for p in tables.key_params:
+        if p.name in kwargs:
+            key_args[p.name] = kwargs[p.name]
+
     # final check for missing args
     for k, p in params.items():
         if p.kind in (p.POSITIONAL_OR_KEYWORD, p.POSITIONAL_ONLY):
@@ -144,6 +154,7 @@ class Func:
 
     func: Callable
     defs: Dict[str, Any]
+    canon_defs: Dict[str, Any]
     pars: Dict[str, Parameter]
     sign: Optional[Signature]
 
@@ -155,16 +166,30 @@ class Func:
             self.sign = inspect.signature(func)
             self.defs = _func_defs(self.sign)
             self.pars = _func_pars(self.sign)
+            self._tables = _ParamTables(self.sign)
         except ValueError:
             # signature not found (e.g. builtins, cython)
             self.sign = None
             self.defs = dict()
             self.pars = dict()
-        self.typs = get_type_hints(func)
+        # normalized default args (filled on demand)
+        self.canon_defs = dict()
+        self._is_gen = inspect.isgeneratorfunction(func)
+        self._is_agen = inspect.isasyncgenfunction(func)
+
+    @cached_property
+    def typs(self) -> Dict[str, Any]:
+        # evaluate type hints on first use
+        try:
+            return get_type_hints(self.func)
+        except (NameError, TypeError) as e:
+            # e.g. unresolvable forward references
+            logger.warning(f'type hints of "{self.name}" not resolved, args are not coerced: {e!r}')
+            return dict()
 
     def call(self, *args, **kwargs) -> Any:
         if self.sign:
-            pos_args, var_args, key_args, missing = _split_args(self.sign, *args, **kwargs)
+            pos_args, var_args, key_args, missing = _split_args(self._tables, args, kwargs)
         else:
             pos_args, var_args, key_args, missing = dict(), {'*': args}, dict(kwargs), list()
 
@@ -175,30 +200,17 @@ class Func:
             var_args = {'*': key_args.pop('*')}
 
         # try to coerce values to match type hint
-        def coerce(k, v):
-            if k in self.typs:
-                typ = self.typs[k]
-                # create "pydantic model" from dict
-                if type(v) is dict and hasattr(typ, 'parse_obj'):
-                    parse_obj = getattr(typ, 'parse_obj')
-                    if inspect.ismethod(parse_obj):
-                        return parse_obj(v)
-                if type(v) is list and typ is Set:
-                    return set(v)
-                if type(v) is list and typ is Tuple:
-                    return tuple(v)
-            return v
-
-        pos_args = dict((k, coerce(k, v)) for k, v in pos_args.items())
-        key_args = dict((k, coerce(k, v)) for k, v in key_args.items())
+        if self.typs:
+            pos_args = dict((k, self._coerce(k, v)) for k, v in pos_args.items())
+            key_args = dict((k, self._coerce(k, v)) for k, v in key_args.items())
 
         # call function
         func = self.func
 
         # make generator functions reiterable
-        if inspect.isgeneratorfunction(func):
+        if self._is_gen:
             func = Regenerator(func)
-        elif inspect.isasyncgenfunction(func):
+        elif self._is_agen:
             func = AsyncRegenerator(func)
 
         if var_args:
@@ -207,9 +219,23 @@ class Func:
         else:
             return func(*pos_args.values(), **key_args)
 
+    def _coerce(self, k: str, v: Any) -> Any:
+        typ = self.typs.get(k)
+        if typ is not None:
+            # create "pydantic model" from dict
+            if type(v) is dict and hasattr(typ, 'parse_obj'):
+                parse_obj = getattr(typ, 'parse_obj')
+                if inspect.ismethod(parse_obj):
+                    return parse_obj(v)
+            if type(v) is list and typ is Set:
+                return set(v)
+            if type(v) is list and typ is Tuple:
+                return tuple(v)
+        return v
+
     def call_args(self, *args, **kwargs) -> Dict[str, Any]:
         if self.sign:
-            pos_args, var_args, key_args, _ = _split_args(self.sign, *args, **kwargs)
+            pos_args, var_args, key_args, _ = _split_args(self._tables, args, kwargs)
         else:
             pos_args, var_args, key_args, _ = dict(), {'*': args}, dict(kwargs), list()
 
@@ -1,4 +1,7 @@
-from typing import Callable, Dict, KeysView, List, Optional, Set, Tuple, TYPE_CHECKING, Union
+import functools
+import operator
+import re
+from typing import Callable, Dict, Iterator, KeysView, List, Optional, Set, TextIO, Tuple, TYPE_CHECKING, Union
 
 if TYPE_CHECKING:
     import graphviz
@@ -7,6 +10,47 @@ if TYPE_CHECKING:
     from flowfish.link import Link
 
 
+_DOT_ID_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?))$')
+_DOT_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def _quote(id: str) -> str:
+    # quote dot identifiers like graphviz does (but never as port or html)
+    if _DOT_ID_RE.match(id) and id.lower() not in _DOT_KEYWORDS:
+        return id
+    return '"' + id.replace('"', '\\"') + '"'
+
+
+_GRAPH_ATTR = {'splines': 'true'}
+_NODE_ATTR = {'fontname': 'times', 'fontsize': '12'}
+_EDGE_ATTR = {'fontname': 'times', 'fontsize': '10'}
+
+
+@functools.lru_cache(maxsize=None)
+def _node_attrs(dumpable: bool, done: bool) -> str:
+    # only a few combinations, so attributes are formatted once
+    node_style = ['rounded']
+    if dumpable:
+        node_style.append('filled')
+    if done:
+        node_style.append('bold')
+    return f' shape=rect style={_quote(",".join(node_style))}'
+
+
+@functools.lru_cache(maxsize=None)
+def _edge_attrs(cachable: bool, kind: str, cross_scope: bool) -> str:
+    # only a few combinations, so attributes are formatted once
+    edge_attr = dict()
+    if not cachable:
+        edge_attr['arrowhead'] = 'onormal'
+    if kind == '&':
+        edge_attr['arrowhead'] = 'odiamond'
+    if cross_scope:
+        edge_attr['dir'] = 'both'
+        edge_attr['arrowtail'] = 'dot'
+    return ''.join(f' {k}={_quote(v)}' for k, v in sorted(edge_attr.items()))
+
+
 def dot(
     graph: 'Graph', node: Optional['Node'] = None, direction=1,
     until_done=False, omit_internal=False, scopes: Optional[Set['Scope']] = None
@@ -17,48 +61,69 @@ def dot(
     except ImportError:
         raise ImportError("graphviz not installed: pip install graphviz")
 
+    g = graphviz.Digraph('Flow', format='svg',
+                         graph_attr=dict(_GRAPH_ATTR),
+                         node_attr=dict(_NODE_ATTR),
+                         edge_attr=dict(_EDGE_ATTR))
+
+    # build the dot statements directly (graphviz quotes and formats every single call)
+    g.body.extend(_dot_body(graph, node, direction, until_done, omit_internal, scopes))
+    return g
+
+
+def dot_stream(
+    fp: TextIO, graph: 'Graph', node: Optional['Node'] = None, direction=1,
+    until_done=False, omit_internal=False, scopes: Optional[Set['Scope']] = None
+):
+    """write dot source to file (same as dot().source, but without building it in memory)"""
+    fp.write('digraph Flow {\n')
+    for kind, attr in (('graph', _GRAPH_ATTR), ('node', _NODE_ATTR), ('edge', _EDGE_ATTR)):
+        fp.write(f'\t{kind} [{" ".join(f"{k}={_quote(v)}" for k, v in sorted(attr.items()))}]\n')
+    fp.writelines(_dot_body(graph, node, direction, until_done, omit_internal, scopes))
+    fp.write('}\n')
+
+
+def _dot_body(
+    graph: 'Graph', node: Optional['Node'], direction,
+    until_done, omit_internal, scopes: Optional[Set['Scope']]
+) -> Iterator[str]:
+
     nodes, links = graph.tree(node, direction, until_done, omit_internal)
 
+    # without scopes (the common case) all nodes and links are kept as they are
     if scopes:
-        links = [link for link in links if link.source._scope in scopes or link.target._scope in scopes]
-        edges = set(link.source for link in links) | set(link.target for link in links)
-        nodes = [n for n in nodes if n._scope in scopes or n in edges]
+        # keep links touching the scopes (and their nodes) in a single pass
+        in_scopes = scopes.__contains__
+        scope_links = []
+        edges = set()
+        for link in links:
+            source, target = link.source, link.target
+            if in_scopes(source._scope) or in_scopes(target._scope):
+                scope_links.append(link)
+                edges.add(source)
+                edges.add(target)
+        links = scope_links
+        nodes = [n for n in nodes if in_scopes(n._scope) or n in edges]
 
-    g = graphviz.Digraph('Flow', format='svg',
-                         graph_attr={'splines': 'true'},
-                         node_attr={'fontname': 'times', 'fontsize': '12'},
-                         edge_attr={'fontname': 'times', 'fontsize': '10'})
     for n in nodes:
-        node_style = ['rounded']
-        if n._dumpable:
-            node_style.append('filled')
-        if n._done:
-            node_style.append('bold')
-
-        g.node(repr(n), label=n.name, shape='rect', style=','.join(node_style))
+        yield f'\t{_quote(repr(n))} [label={_quote(n.name)}{_node_attrs(n._dumpable, n._done)}]\n'
 
     for link in links:
-        edge_attr = dict()
-        if not link.source._cachable:
-            edge_attr['arrowhead'] = 'onormal'
-        if link.kind == '&':
-            edge_attr['arrowhead'] = 'odiamond'
-        if link.source.scope != link.target.scope:
-            edge_attr['dir'] = 'both'
-            edge_attr['arrowtail'] = 'dot'
-
-        g.edge(repr(link.source), repr(link.target), label=link.name, **edge_attr)
+        attrs = _edge_attrs(link.source._cachable, link.kind, link.source.scope != link.target.scope)
+        yield f'\t{_quote(repr(link.source))} -> {_quote(repr(link.target))} [label={_quote(link.name)}{attrs}]\n'
 
     # draw start/end node
     if node:
         if direction == 1:
-            g.node('.', label='', shape='doublecircle')
-            g.edge('.', repr(node))
+            yield '\t"." [label="" shape=doublecircle]\n'
+            yield f'\t"." -> {_quote(repr(node))}\n'
         elif direction == -1:
-            g.node('.', label='', shape='doublecircle')
-            g.edge(repr(node), '.')
+            yield '\t"." [label="" shape=doublecircle]\n'
+            yield f'\t{_quote(repr(node))} -> "."\n'
 
-    return g
+
+# shared (and never changed) adjacency of unlinked nodes
+_NO_LINKS: Dict['Link', None] = dict()
 
 
 class Graph:
@@ -66,80 +131,146 @@ class Graph:
     _nodes: Dict['Node', None]  # keep node order
     _outgoing: Dict['Node', Dict['Link', None]]  # keep link order
     _incoming: Dict['Node', Dict['Link', None]]  # keep link order
+    _outgoing_public: Dict['Node', Dict['Link', None]]  # without internal links
+    _incoming_public: Dict['Node', Dict['Link', None]]  # without internal links
 
     def __init__(self):
         self._nodes = dict()
         self._outgoing = dict()
         self._incoming = dict()
+        self._outgoing_public = dict()
+        self._incoming_public = dict()
+        # cached trees (cleared on changes)
+        self._tree_cache: Dict[Tuple, Tuple[Tuple['Node', ...], Tuple['Link', ...]]] = dict()
+
+    def _changed(self):
+        self._tree_cache.clear()
 
     def nodes(self) -> KeysView['Node']:
         return self._nodes.keys()
 
     def add_node(self, node: 'Node'):
-        self._nodes[node] = None
+        if node not in self._nodes:
+            self._nodes[node] = None
+            self._changed()
 
     def add_link(self, link: 'Link'):
         if link.source == link.target:
             raise RecursionError(f'Link failed: {link} (self reference)')
 
         self._nodes[link.source] = None
-        if link.source not in self._outgoing:
-            self._outgoing[link.source] = dict()
-        self._outgoing[link.source][link] = None
+        _add_adj(self._outgoing, self._outgoing_public, link.source, link)
 
         self._nodes[link.target] = None
-        if link.target not in self._incoming:
-            self._incoming[link.target] = dict()
-        self._incoming[link.target][link] = None
+        _add_adj(self._incoming, self._incoming_public, link.target, link)
+
+        self._changed()
 
     def tree(self, node: Optional['Node'] = None, direction=1,
              until_done: Union[bool, Callable[['Node'], bool]] = False,
              omit_internal: bool = False
              ) -> Tuple[List['Node'], List['Link']]:
 
-        return self._tree(node, direction, until_done, omit_internal, dict(), dict())
+        # only trees without done checks are cachable (nodes may get done any time)
+        if until_done is False:
+            key = (node, direction, omit_internal)
+            if key not in self._tree_cache:
+                nodes, links = self._tree(node, direction, until_done, omit_internal)
+                self._tree_cache[key] = (tuple(nodes), tuple(links))
+            nodes_, links_ = self._tree_cache[key]
+            return list(nodes_), list(links_)
+
+        return self._tree(node, direction, until_done, omit_internal)
 
     def _tree(self, node: Optional['Node'], direction,
-              until_done, omit_internal,
-              nodes: Dict['Node', None],
-              links: Dict['Link', None], branch=[]) -> Tuple[List['Node'], List['Link']]:
+              until_done, omit_internal) -> Tuple[List['Node'], List['Link']]:
+        nodes: List['Node'] = []  # in visiting order
+        links: List['Link'] = []  # in visiting order
+
         if node:
-            nodes[node] = None
+            roots = [node]
+        elif not direction or direction == 1:
+            # from root node
+            roots = [node for node in self._nodes if node not in self._incoming]
+        else:
+            roots = []
+
+        # both directions are walked one after the other
+        if not direction or direction == 1:
+            self._walk(roots, 1, until_done, omit_internal, nodes, links)
+        if not direction or direction == -1:
+            self._walk(roots, -1, until_done, omit_internal, nodes, links)
+
+        # a single walk visits each node and follows each link only once
+        if not direction:
+            return list(dict.fromkeys(nodes)), list(dict.fromkeys(links))
+        return nodes, links
+
+    def _walk(self, roots: List['Node'], direction: int,
+              until_done, omit_internal,
+              nodes: List['Node'],
+              links: List['Link']):
+        # depth-first traversal in one direction with an explicit stack instead of recursion
+        if direction == 1:
+            adjacency = self._outgoing_public if omit_internal else self._outgoing
+            endpoint = operator.attrgetter('target')
+        else:
+            adjacency = self._incoming_public if omit_internal else self._incoming
+            endpoint = operator.attrgetter('source')
+
+        stack: List[Tuple['Node', Iterator['Link']]] = []
+        branch: List['Node'] = []  # nodes on current path
+        on_path: Set['Node'] = set()  # nodes of branch
+        visited: Set['Node'] = set()  # fully traversed nodes
+
+        def visit(node: 'Node'):
+            nodes.append(node)
             if callable(until_done):
                 done = until_done(node)
             else:
                 done = until_done and node._done
-            if not done:
-                if not direction or direction == 1:
-                    branch = branch + [node]
-                    if node in self._outgoing:
-                        for link in self._outgoing[node]:
-                            if omit_internal and link.internal:
-                                continue
-                            target = link.target
-                            if target in branch:
-                                loop = map(lambda n: f'{{{n}}}' if target == n else f'{n}',
-                                           branch + [target])
-                                raise RecursionError(f'loop detected: {" -> ".join(loop)}')
-                            links[link] = None
-                            self._tree(target, 1, until_done, omit_internal, nodes, links, branch)
-                if not direction or direction == -1:
-                    branch = branch + [node]
-                    if node in self._incoming:
-                        for link in self._incoming[node]:
-                            if omit_internal and link.internal:
-                                continue
-                            source = link.source
-                            if source in branch:
-                                loop = map(lambda n: f'{{{n}}}' if source == n else f'{n}',
-                                           reversed(branch + [source]))
-                                raise RecursionError(f'loop detected: {" <- ".join(loop)}')
-                            links[link] = None
-                            self._tree(source, -1, until_done, omit_internal, nodes, links, branch)
-        else:
-            # from root node
-            if not direction or direction == 1:
-                for node in self._nodes:
-                    if node not in self._incoming:
-                        self._tree(node, direction, until_done, omit_internal, nodes, links, branch)
-        return list(nodes), list(links)
+            branch.append(node)
+            on_path.add(node)
+            stack.append((node, iter(()) if done else iter(adjacency.get(node, _NO_LINKS))))
+
+        for root in roots:
+            visit(root)
+            while stack:
+                node, follow = stack[-1]
+                for link in follow:
+                    next_node = endpoint(link)
+                    if next_node in on_path:
+                        raise _loop_error(branch, next_node, direction)
+                    links.append(link)
+                    # subtree already known (and free of loops)
+                    if next_node in visited:
+                        continue
+                    visit(next_node)
+                    break
+                else:
+                    stack.pop()
+                    branch.pop()
+                    on_path.discard(node)
+                    visited.add(node)
+
+
+def _add_adj(adj: Dict['Node', Dict['Link', None]],
+             public_adj: Dict['Node', Dict['Link', None]],
+             node: 'Node', link: 'Link'):
+    # public links of a node share the dict of all links until an internal link is added
+    links = adj.get(node)
+    if links is None:
+        links = adj[node] = public_adj[node] = dict()
+    if link.internal:
+        if public_adj[node] is links:
+            public_adj[node] = dict(links)
+    elif public_adj[node] is not links:
+        public_adj[node][link] = None
+    links[link] = None
+
+
+def _loop_error(branch: List['Node'], node: 'Node', direction: int) -> RecursionError:
+    # only called on loops, so the branch is formatted here and never while traversing
+    path = branch + [node]
+    loop = (f'{{{n}}}' if node == n else f'{n}' for n in (path if direction == 1 else reversed(path)))
+    return RecursionError(f'loop detected: {(" -> " if direction == 1 else " <- ").join(loop)}')
@@ -1,6 +1,7 @@
+import functools
 import os
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
 
 from flowfish.builtins import map_simpleeval
 
@@ -8,6 +9,16 @@ if TYPE_CHECKING:
     from flowfish.node import Node
 
 
+@functools.lru_cache(maxsize=1024)
+def _short_path(path: Path, data_dir: Path, cwd: Path) -> Path:
+    """path relative to data dir or working dir (shared by all links of a flow)"""
+    parents = set(path.parents)
+    for base_dir in (data_dir, cwd):
+        if base_dir in parents:
+            return path.relative_to(base_dir)
+    return path
+
+
 class Link:
 
     def __init__(self, source: 'Node', target: 'Node', param: str, value: str, kind: str):
@@ -16,60 +27,68 @@ class Link:
         self.param = param
         self.value = value
         self.kind = kind
-
-    @property
-    def internal(self):
-        return self.param.startswith('_')
-
-    @property
-    def name(self):
-        return self.param
+        self.name = param
+        self.internal = param.startswith('_')
+        self._repr: Optional[str] = None  # source and target never change (but the working dir may)
+        # split value once into work dir path and expression
+        self._path: Optional[str] = None  # "@source/path" (None if no path)
+        self._expr: Optional[str] = None  # "@source:expr" or "@source/.:expr"
+        self._value_path = value == '/.'  # "@source/."
+        if value and value.startswith('/'):
+            path = value[1:]
+            if path.startswith('.') and not self._value_path:
+                path = path[1:]
+                if path.startswith(':'):
+                    path, self._expr = '', path[1:]
+            self._path = path
+        elif value and value.startswith(':'):
+            self._expr = value[1:]
 
     def __repr__(self):
+        if self._repr is not None:
+            return self._repr
+        repr_ = self._make_repr()
+        # paths of inter-flow links depend on the working dir
+        if self.source._flow == self.target._flow:
+            self._repr = repr_
+        return repr_
+
+    def _make_repr(self) -> str:
         link = self
-        value = link.kind
         if link.source == link.target:
-            value += '.'
+            ref = '.'
         elif link.source._flow != link.target._flow:
             # create inter-flow link
             path = link.source._flow._file
             assert path is not None, 'flow link source requires file'
-            for base_dir in (link.source._flux.data_dir, Path.cwd()):
-                if base_dir in path.parents:
-                    path = path.relative_to(base_dir)
-                    break
-            value += f'{path}#{link.source.scope}.{link.source.name}'
-        else:
+            path = _short_path(path, link.source._flux.data_dir, Path.cwd())
+            ref = f'{path}#{link.source.scope}.{link.source.name}'
+        elif link.source.scope != link.target.scope:
             # create intra-flow link
-            if link.source.scope != link.target.scope:
-                value += f'{link.source.scope}.{link.source.name}'
-            else:
-                value += f'{link.source.name}'
-        if link.value:
-            value += link.value
-        return value
+            ref = f'{link.source.scope}.{link.source.name}'
+        else:
+            ref = link.source.name
+        return f'{link.kind}{ref}{link.value or ""}'
 
     # TODO refactor to function
     def resolve(self, value, ref):
         if self.kind in ('@', '&'):
             input = value if self.kind == '@' else ref
             # target: "@source/"
-            if self.value and self.value.startswith('/'):
-                path = self.value[1:]
+            if self._path is not None:
+                path = self._path
+                # target: "@source/.:"
+                if self._expr is not None:
+                    path = map_simpleeval(input, self._expr)
+                    assert isinstance(path, str), 'expression must return a string'
                 # target: "@source/."
-                if path == '.':
+                elif self._value_path:
                     path = value
-                elif path.startswith('.'):
-                    path = path[1:]
-                    # target: "@source/.:"
-                    if path.startswith(':'):
-                        path = map_simpleeval(input, path[1:])
-                        assert isinstance(path, str), 'expression must return a string'
                 os.makedirs(self.source._work_dir, exist_ok=True)
                 return str(self.source._work_dir / path)
             # target: "@source:"
-            if self.value and self.value.startswith(':'):
-                return map_simpleeval(input, self.value[1:])
+            if self._expr is not None:
+                return map_simpleeval(input, self._expr)
             return input
         else:
             raise ValueError(f'unknown assignment: {repr(self)}')
@@ -16,10 +16,13 @@ class KeyedLocks:
         return self.get(key)
 
     def get(self, key: Any) -> RLock:
+        # fast path without lock (a single lookup is atomic)
+        lock = self._keys.get(key)
+        if lock is not None:
+            return lock
         with self._lock:
-            if key in self._keys:
-                lock = self._keys[key]
-            else:
+            lock = self._keys.get(key)
+            if lock is None:
                 lock = RLock()
                 self._keys[key] = lock
             return lock
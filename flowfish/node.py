@@ -1,19 +1,25 @@
 import asyncio
-import copy
-import functools
+from collections import deque
 import inspect
 import json
 import os
 from pathlib import Path
+import pickle
 import re
 import shutil
 import time
-from typing import Any, Callable, Dict, List, Optional, Set, Union, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Union, Tuple, TYPE_CHECKING
 import warnings
 
 import cloudpickle
 import filelock
 
+try:
+    import fcntl
+except ImportError:
+    # not available on windows
+    fcntl = None  # type: ignore
+
 from flowfish.conf import (
     RewriteArgsConf, RewriteBaseConf, RewriteCallConf, RewriteFlowConf,
     RewriteHashConf, RewriteNodeConf
@@ -22,9 +28,9 @@ from flowfish.func import AsyncRegenerator, Func, Regenerator
 from flowfish.error import FlowError, NodeNotFoundError, ScopeNotFoundError
 from flowfish.graph import dot
 from flowfish.utils import (
-    copy_file, copy_props, hash32, humantime,
+    clone_conf, copy_file, copy_files, copy_props, hash32, humantime,
     pip_install, pool_run, resolve_packages, wrap_tqdm,
-    readlines, writelines
+    readlines, walk_files, writelines
 )
 
 if TYPE_CHECKING:
@@ -34,6 +40,17 @@ if TYPE_CHECKING:
     from flowfish.link import Link  # noqa: F401
 
 
+# e.g. 3ed0ab (hex string of a 32-bit hash)
+_HASH_RE = re.compile(r'[a-z0-9]{1,8}')
+
+# protocol 5 writes buffers (e.g. of numpy arrays) without copying them (requires Python 3.8)
+_PICKLE_PROTOCOL = min(pickle.HIGHEST_PROTOCOL, 5)
+
+# delays of polling the sync dir (doubled while nothing changes)
+_POLL_MIN_DELAY = 0.05
+_POLL_MAX_DELAY = 1.0
+
+
 class Empty:
     pass
 
@@ -50,16 +67,29 @@ class Node:
     _node_conf: Dict
     _args_conf: Dict
     _hash_conf: Dict
+    _slug: str
+    _base_dir: Path  # base directory of the node's scope
+    _work_dir: Path
+    _data_file: Path
+    _conf_file: Path
+    _sync_file: Optional[Path]
+    _lock_dir: Path
+    _lock_file: Path
 
     def __init__(self, flux: 'Flux', flow: 'Flow', scope: 'Scope', name: str, conf: Dict):
         self._flux = flux
+        self._cache = flux.cache
         self._flow = flow
         self._scope = scope
         self._name = name
         self._conf = conf
 
-        # keep initial conf
-        self._init_conf = copy.deepcopy(conf)
+        # keep initial conf (a shallow copy is enough, only top-level keys of conf are set later)
+        self._init_conf = dict(conf)
+
+        # cached results of _deps() and _flow_conf() (links and confs are fixed after setup)
+        self._deps_cache: Optional[FrozenSet['Node']] = None
+        self._flow_conf_cache: Optional[Dict] = None
 
     @property
     def _logger(self):
@@ -69,10 +99,6 @@ class Node:
     def slug(self) -> str:
         return self._slug
 
-    @property
-    def _slug(self) -> str:
-        return f'{self.base}.{self.hash}'
-
     @property
     def base(self) -> str:
         return self._conf['_base']
@@ -105,11 +131,6 @@ class Node:
         # use value from scope unless set
         return self._conf.get('_requires', self._scope._requires)
 
-    @property
-    def _base_dir(self):
-        """base directory of the node's scope"""
-        return self._data_dir / self._path
-
     @property
     def _data_dir(self):
         """data directory of the flow"""
@@ -119,58 +140,46 @@ class Node:
     def path(self) -> Path:
         return self._work_dir
 
-    @property
-    def _work_dir(self) -> Path:
-        return self._base_dir / self._slug
-
-    @property
-    def _data_file(self) -> Path:
-        return self._base_dir / f'{self._slug}.data'
-
-    @property
-    def _conf_file(self) -> Path:
-        return self._base_dir / f'{self._slug}.json'
-
     @property
     def _synced(self) -> bool:
         """check if node is synced to sync_dir"""
-        return self._sync_file is not None and self._sync_file.is_file()
+        return self._sync_file is not None and os.path.isfile(self._sync_file)
 
     @property
     def _sync_dir(self):
         return self._flux.sync_dir
 
-    @property
-    def _sync_file(self) -> Optional[Path]:
-        if self._sync_dir:
-            return self._sync_dir / self._path / '.sync' / f'{self._slug}.sync'
-        else:
-            return None
-
     @property
     def _locked(self) -> bool:
-        if self._lock_file.is_file():
-            try:
-                lock = filelock.FileLock(str(self._lock_file))
-                lock.acquire(0)
-            except TimeoutError:
-                return True
+        if fcntl is None:
+            if self._lock_file.is_file():
+                try:
+                    with filelock.FileLock(str(self._lock_file)).acquire(0):
+                        pass
+                except TimeoutError:
+                    return True
+            return False
+
+        # probe the lock file directly (filelock uses flock as well)
+        try:
+            fd = os.open(self._lock_file, os.O_RDONLY)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
         return False
 
-    @property
-    def _lock_dir(self) -> Path:
-        return self._base_dir / '.lock'
-
-    @property
-    def _lock_file(self) -> Path:
-        return self._lock_dir / f'{self._slug}.lock'
-
     @property
     def doable(self) -> bool:
         """A node is doable if all dumpable dependenies are already dumped"""
         check_dumpable: Callable[[Node], bool] = lambda n: n._dumpable
         nodes, _ = self._tree(-1, until_done=check_dumpable)
-        return all([n._dumped for n in nodes if n._dumpable])
+        return all(n._dumped for n in nodes if n._dumpable)
 
     @property
     def done(self) -> bool:
@@ -187,29 +196,22 @@ class Node:
 
     @property
     def _cached(self) -> bool:
-        return self.data is not Node.empty
+        return self._slug in self._cache
 
     @property
     def data(self):
-        cache = self._flux.cache
-        if self._slug in cache:
-            return cache[self._slug]
-        else:
-            return Node.empty
+        return self._cache.get(self._slug, Node.empty)
 
     @data.setter
     def data(self, data):
-        cache = self._flux.cache
         if data is Node.empty:
             del self.data
         else:
-            cache[self._slug] = data
+            self._cache[self._slug] = data
 
     @data.deleter
     def data(self):
-        cache = self._flux.cache
-        if self._slug in cache:
-            del cache[self._slug]
+        self._cache.pop(self._slug, None)
 
     @property
     def _dumpable(self) -> bool:
@@ -218,17 +220,18 @@ class Node:
     @property
     def _dumped(self) -> bool:
         """check if node is dumped to data_dir"""
-        return self._data_file.is_file()
+        # os.path.isfile skips the Path.stat wrapper (polled often)
+        return os.path.isfile(self._data_file)
 
     @property
     def args(self) -> Dict:
         # create a copy
-        return copy.deepcopy(self._args_conf)
+        return clone_conf(self._args_conf)
 
     @property
     def conf(self) -> Dict:
         # create a copy
-        return copy.deepcopy(self._flow_conf())
+        return clone_conf(self._flow_conf())
 
     def _node_crumb(self):
         if self._flow._file:
@@ -292,13 +295,13 @@ class Node:
                 self._base_node = None
 
             # 4) resolve all base_nodes recursively
-            branch = []
+            branch: Dict['Node', None] = dict()  # ordered set
             node = self
             while node:
-                branch += [node]
+                branch[node] = None
                 node = node._resolve_base()
                 if node in branch:
-                    loop = map(lambda n: f'[{n.scope}.{n.name}]' if node == n else f'{n.scope}.{n.name}', branch + [node])
+                    loop = map(lambda n: f'[{n.scope}.{n.name}]' if node == n else f'{n.scope}.{n.name}', [*branch, node])
                     raise RecursionError(f'Loop detected: {" @ ".join(loop)}')
 
             return self._base_node
@@ -318,7 +321,7 @@ class Node:
         crumb = self._node_crumb()
         raise NodeNotFoundError(f'{crumb}: "{link}"')
 
-    def _setup_node(self, branch=[]):
+    def _setup_node(self, branch: Optional[Dict['Node', None]] = None):
         if hasattr(self, '_node_conf'):
             return self
 
@@ -338,7 +341,7 @@ class Node:
         self._links = []
         self._base_conf = RewriteBaseConf(self, self._links).rewrite(self._conf)
         self._node_conf = RewriteNodeConf(self._func.defs).rewrite(self._base_conf)
-        self._args_conf = RewriteArgsConf(self._func.defs).rewrite(self._node_conf)
+        self._args_conf = RewriteArgsConf(self._func.defs, self._func.canon_defs).rewrite(self._node_conf)
 
         # link nodes
         self._flux.graph.add_node(self)
@@ -354,16 +357,21 @@ class Node:
         self.__doc__ = wrapped_docs
         self.__signature__ = wrapped_sign
 
-        # ensure branch
-        branch = branch + [self]
-        for link in self._links:
-            if link.source != self:
-                node = link.source
-                if node in branch:
-                    loop = map(lambda n: f'[{n.scope}.{n.name}]' if node == n else f'{n.scope}.{n.name}',
-                               branch + [node])
-                    raise RecursionError(f'Loop detected: {" @ ".join(loop)}')
-                node._setup_node(branch)
+        # ensure branch (ordered set of nodes on current path)
+        if branch is None:
+            branch = dict()
+        branch[self] = None
+        try:
+            for link in self._links:
+                if link.source != self:
+                    node = link.source
+                    if node in branch:
+                        loop = map(lambda n: f'[{n.scope}.{n.name}]' if node == n else f'{n.scope}.{n.name}',
+                                   [*branch, node])
+                        raise RecursionError(f'Loop detected: {" @ ".join(loop)}')
+                    node._setup_node(branch)
+        finally:
+            del branch[self]
 
         # NOTE: A hash collision can occur if a node name is also used in another scope
         # with identical parameterization but different function, because the function
@@ -373,16 +381,30 @@ class Node:
 
         # create new hash or reuse existing hash
         if '_hash' not in self._node_conf:
-            dump = json.dumps(self._hash_conf, sort_keys=True)
+            # hash conf is a fresh tree (no need to check for cycles)
+            dump = json.dumps(self._hash_conf, sort_keys=True, check_circular=False)
             self._hash = hash32(dump)
             self._base_conf['_hash'] = self._hash
             self._node_conf['_hash'] = self._hash
         else:
             hash_ = self._node_conf['_hash']
-            if not isinstance(hash_, str) or not re.match(r'[a-z0-9]{1,8}', hash_):
+            if not isinstance(hash_, str) or not _HASH_RE.fullmatch(hash_):
                 raise ValueError(f'"_hash" must be a 32-bit hex string and not: {hash_}')
             self._hash = hash_
 
+        # slug and paths never change once the hash is known
+        self._slug = f'{self.base}.{self._hash}'
+        self._base_dir = self._data_dir / self._path
+        self._work_dir = self._base_dir / self._slug
+        self._data_file = self._base_dir / f'{self._slug}.data'
+        self._conf_file = self._base_dir / f'{self._slug}.json'
+        if self._sync_dir:
+            self._sync_file = self._sync_dir / self._path / '.sync' / f'{self._slug}.sync'
+        else:
+            self._sync_file = None
+        self._lock_dir = self._base_dir / '.lock'
+        self._lock_file = self._lock_dir / f'{self._slug}.lock'
+
         return self
 
     def _find_func(self, name: str, code: Optional[str] = None) -> 'Func':
@@ -412,40 +434,50 @@ class Node:
         # run missing steps on agent and wait for completion
         assert self._sync_dir, "sync_dir is not set"
 
-        def _copy_done(node: 'Node'):
-            for n in node._deps():
+        # copy deps that are already done and not yet synced
+        # TODO copy work_dir of self and deps even if not yet done
+        queue = deque([self])
+        seen = {self}
+        while queue:
+            for n in queue.popleft()._deps():
+                if n in seen:
+                    continue
+                seen.add(n)
                 if (n._dumpable and n._dumped) and not n._synced:
                     n.push(copy_all=True)
                 if not (n._done or n._synced):
-                    _copy_done(n)
+                    queue.append(n)
 
-        # copy deps that are already done and not yet synced
-        # TODO copy work_dir of self and deps even if not yet done
-        _copy_done(self)
-
-        def _find_todo(node: 'Node', todos: Set['Node']):
+        # find todos, e.g. a -> *b:dumpable -> c:dumpable -> d:dumped|synced
+        todos: Set['Node'] = set()
+        queue = deque([self])
+        seen = {self}
+        while queue:
+            node = queue.popleft()
             if not node._done and not node._synced and node._dumpable:
                 todos.add(node)
             elif not (node._done or node._synced):
                 for n in node._deps():
-                    _find_todo(n, todos)
-
-        # find todos, e.g. a -> *b:dumpable -> c:dumpable -> d:dumped|synced
-        todos: Set['Node'] = set()
-        _find_todo(self, todos)
+                    if n not in seen:
+                        seen.add(n)
+                        queue.append(n)
 
         # create job if necessary
         if todos:
             self._create_job(agent, self._sync_dir)
 
         # wait for todos to pull from agent
+        delay = _POLL_MIN_DELAY
         while todos:
-            for todo in set(todos):
-                if todo._synced:
-                    todo.pull()
-                    todos.remove(todo)
-                else:
-                    time.sleep(1)
+            synced = set(todo for todo in todos if todo._synced)
+            for todo in synced:
+                todo.pull()
+            todos -= synced
+            if synced:
+                delay = _POLL_MIN_DELAY
+            elif todos:
+                time.sleep(delay)
+                delay = min(delay * 2, _POLL_MAX_DELAY)
 
     def _create_job(self, agent: str, data_dir: Path):
         job_file = data_dir / self._path / '.jobs' / f'{self._slug}.{agent}.json'
@@ -454,24 +486,39 @@ class Node:
         os.makedirs(job_file.parent, exist_ok=True)
         # overwrite job file
         with open(job_file, 'w') as f:
-            json.dump(self._flow_conf(), f, sort_keys=True, indent=4)
+            f.write(json.dumps(self._flow_conf(), sort_keys=True, indent=4))
 
     def _call(self):
-        nodes, links = self._tree(-1, until_done=lambda n: n._done)
+        # check each node only once per call (done checks stat data files)
+        done: Dict['Node', bool] = dict()
+
+        def until_done(n: 'Node') -> bool:
+            done[n] = n._done
+            return done[n]
+
+        nodes, links = self._tree(-1, until_done=until_done)
         byval_sources = set(link.source for link in links if link.kind == '@')
         byval_sources.add(self)  # don't forget to add self
         byref_sources = set(link.source for link in links if link.kind == '&')
 
-        funcs = dict((n, functools.partial(self._call_node, n, byval_sources, byref_sources)) for n in nodes)
-        tasks = dict((funcs[n], [funcs[d] for d in n._deps()] if not n._done else None)
+        call_node = self._call_node
+
+        def make_task(n: 'Node'):
+            return lambda vals: call_node(n, byval_sources, byref_sources, vals)
+
+        funcs = dict((n, make_task(n)) for n in nodes)
+        # done nodes need no deps, they are loaded from cache or dump
+        tasks = dict((funcs[n], None if done[n] else [funcs[d] for d in n._deps()])
                      for n in nodes)
 
         for n, (v, r) in pool_run(tasks):  # type: ignore
             if n == self:
                 return v
 
-    def _deps(self) -> Set['Node']:
-        return set(link.source for link in self._links if link.source != self)
+    def _deps(self) -> FrozenSet['Node']:
+        if self._deps_cache is None:
+            self._deps_cache = frozenset(link.source for link in self._links if link.source != self)
+        return self._deps_cache
 
     def _call_node(
         self,
@@ -488,13 +535,18 @@ class Node:
         try:
             needs_val = node in byval_sources
             needs_ref = node in byref_sources
-            with node._lock():
-                r, v = None, None
-                if needs_val:
+            r, v = None, None
+            if needs_val:
+                if node._cachable and node._cached:
+                    # cached values need no lock
                     v = node._call_now(dict(vals))
-                if needs_ref:
-                    r = node._call_later(dict(vals))
-                return (node, (v, r))
+                else:
+                    with node._lock():
+                        v = node._call_now(dict(vals))
+            if needs_ref:
+                # references are called later (and without lock anyway)
+                r = node._call_later(dict(vals))
+            return (node, (v, r))
         except Exception as e:
             raise FlowError(f'call failed: {repr(node)}') from e
 
@@ -521,7 +573,7 @@ class Node:
                     f'<c>{self.scope}</c>: call <c>{self.name}</c> {{}}', self.args)
             call_time = time.time()
             with warnings.catch_warnings():
-                warnings.filterwarnings("ignore")
+                warnings.simplefilter("ignore")
                 v = self._call_func(vals, *args, **kwargs)
             call_time = time.time() - call_time
             if stats['call_count'] == 1:
@@ -557,7 +609,7 @@ class Node:
 
             call_time = time.time()
             with warnings.catch_warnings():
-                warnings.filterwarnings("ignore")
+                warnings.simplefilter("ignore")
                 v = self._call_func(dict(vals))
             call_time = time.time() - call_time
 
@@ -606,8 +658,10 @@ class Node:
         return call_conf
 
     def _call_coro(self, coro):
-        loop = self._flux.loop or self._flux.loop_thread.loop()
-        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        if self._flux.loop:
+            future = asyncio.run_coroutine_threadsafe(coro, self._flux.loop)
+        else:
+            future = self._flux.loop_thread.submit(coro)
         result = future.result()
         return result
 
@@ -626,7 +680,7 @@ class Node:
     def save(self, filename: Optional[Union[str, Path]] = None):
         if filename:
             with open(filename, 'w') as f:
-                json.dump(self._flow_conf(), f, sort_keys=True, indent=4)
+                f.write(json.dumps(self._flow_conf(), sort_keys=True, indent=4))
             self._logger.info(
                 f'<c>{self.scope}</c>: save <c>{self.name}</c> to {filename}')
         else:
@@ -637,9 +691,12 @@ class Node:
     def _dump_conf(self):
         os.makedirs(self._base_dir, exist_ok=True)
         with open(self._conf_file, 'w') as f:
-            json.dump(self._flow_conf(), f, sort_keys=True, indent=4)
+            f.write(json.dumps(self._flow_conf(), sort_keys=True, indent=4))
 
     def _flow_conf(self) -> Dict:
+        # NOTE: shared result, callers must not change it
+        if self._flow_conf_cache is not None:
+            return self._flow_conf_cache
         base_conf = self._base_conf
         scope_conf = {self.name: RewriteFlowConf().rewrite(base_conf)}
 
@@ -657,6 +714,7 @@ class Node:
                     if k not in flow_conf:
                         flow_conf[k] = dict()
                     flow_conf[k].update(v)
+        self._flow_conf_cache = flow_conf
         return flow_conf
 
     def _dump_data(self, data):
@@ -665,7 +723,7 @@ class Node:
         with open(temp_file, 'wb') as f:
             # NOTE: cloudpickle and pickle are compatible,
             # so it can be used as a drop-in replacement
-            cloudpickle.dump(data, f, protocol=4)
+            cloudpickle.dump(data, f, protocol=_PICKLE_PROTOCOL)
         temp_file.rename(self._data_file)
 
     def _tree(
@@ -722,27 +780,33 @@ class Node:
         source_dir = self._data_dir
         target_dir = self._sync_dir
 
-        nodes, _ = self._tree(-1, until_done=lambda n: n._dumped or n._synced)
+        # check each node only once per push (checks stat files)
+        dumped: Dict['Node', bool] = dict()
+        synced: Dict['Node', bool] = dict()
+
+        def until_done(n: 'Node') -> bool:
+            dumped[n] = n._dumped
+            synced[n] = n._synced
+            return dumped[n] or synced[n]
+
+        nodes, _ = self._tree(-1, until_done=until_done)
 
         for node in nodes:
             assert node._sync_file is not None, "sync dir not set"
 
             if copy_all:
-                node_dumped = node._dumpable and node._dumped or node._work_dir.is_dir() and node._conf_file.is_file()
+                node_dumped = node._dumpable and dumped[node] or node._work_dir.is_dir() and node._conf_file.is_file()
             else:
-                node_dumped = node._dumpable and node._dumped
+                node_dumped = node._dumpable and dumped[node]
 
-            if node_dumped and not node._synced:
+            if node_dumped and not synced[node]:
                 """copy all node files and create .sync file"""
                 self._logger.info(
                     f'<c>{node.scope}</c>: push <c>{node.name}</c> to {target_dir / node._path / node._slug}')
 
-                files = []  # keep order of insertion
-
                 # scan work_dir
-                for f in node._work_dir.glob('**/*'):
-                    if f.is_file():
-                        files.append(f.relative_to(source_dir))
+                files = [f.relative_to(source_dir) for f in walk_files(node._work_dir)]
+                work_files = len(files)
 
                 # add conf file
                 if node._conf_file.is_file():
@@ -752,11 +816,10 @@ class Node:
                 if node._data_file.is_file():
                     files.append(node._data_file.relative_to(source_dir))
 
-                # copy files
-                for f in files:
-                    src = source_dir / f
-                    dst = target_dir / f
-                    copy_file(src, dst)
+                # copy work files in parallel, then conf and data file
+                copy_files((source_dir / f, target_dir / f) for f in files[:work_files])
+                for f in files[work_files:]:
+                    copy_file(source_dir / f, target_dir / f)
 
                 # track files
                 if not node._sync_file.is_file():
@@ -780,6 +843,7 @@ class Node:
 
                 if node._synced:
                     files = set(readlines(node._sync_file))
+                    delay = _POLL_MIN_DELAY
                     while files:
                         for f in set(files):
                             src = source_dir / f
@@ -788,7 +852,8 @@ class Node:
                                 files.remove(f)
                                 copy_file(src, dst)
                         if files:
-                            time.sleep(1)
+                            time.sleep(delay)
+                            delay = min(delay * 2, _POLL_MAX_DELAY)
 
     def _copy_data(self, target: 'Node'):
         """copy node data to otehr node"""
@@ -796,9 +861,7 @@ class Node:
         self._logger.info(f'<c>{self.scope}</c>: copy <c>{self.name}</c> to {target}')
 
         # scan work_dir
-        for f in self._work_dir.glob('**/*'):
-            if f.is_file():
-                copy_file(f, target._work_dir / f.relative_to(self._work_dir))
+        copy_files((f, target._work_dir / f.relative_to(self._work_dir)) for f in walk_files(self._work_dir))
 
         # add data file last
         if self._data_file.is_file():
@@ -1,4 +1,3 @@
-import copy
 from pathlib import Path
 import re
 from typing import Dict, Iterator, List, Union, TYPE_CHECKING
@@ -6,19 +5,32 @@ from typing import Dict, Iterator, List, Union, TYPE_CHECKING
 from flowfish.error import FlowError, NodeNotFoundError, ScopeNotFoundError
 from flowfish.graph import dot
 from flowfish.node import Node
-from flowfish.utils import copy_props
+from flowfish.utils import cached_property, clone_conf, copy_props
 
 if TYPE_CHECKING:
     from flowfish.flux import Flux
     from flowfish.flow import Flow
 
+_FILE_SCOPE_RE = re.compile(r'^[^#]+#\w+$', re.ASCII)
+_SLUG_LINK_RE = re.compile(r'^\w+#\w+\.[a-z0-9]{1,8}$', re.ASCII)
+_FILE_NODE_RE = re.compile(r'^[^#]+#\w+\.\w+$', re.ASCII)
+_SCOPE_NODE_RE = re.compile(r'^\w+\.\w+$', re.ASCII)
+
+
+def _is_name(s: str) -> bool:
+    # same as re.match(r'^\w+$', s, re.ASCII) but without regex
+    return s.isascii() and s.replace('_', 'a').isalnum()
+
 
 class Scope:
 
     _nodes: Dict[str, 'Node']
+    _found_nodes: Dict[str, 'Node']
 
     def __init__(self, flux: 'Flux', flow: 'Flow', name: str, conf: Dict, props: Dict):
         self._nodes = dict()
+        # nodes found by _find_node (only after merging, reset when nodes are added)
+        self._found_nodes = dict()
         self._flux = flux
         self._flow = flow
         self._name = name
@@ -26,18 +38,18 @@ class Scope:
         self._props = props
 
         # keep initial conf
-        self._init_conf = copy.deepcopy(conf)
+        self._init_conf = clone_conf(conf)
 
         # add nodes
         for node_name, node_conf in conf.items():
-            if node_name.startswith('#') or node_name.startswith('_'):
+            if node_name[:1] in ('#', '_'):
                 continue
             self._add_node(node_name, node_conf)
 
         # add missing nodes from props, e.g. _props.foo=@bar -> foo@bar
         for k, v in self._props.items():
             # skip comments
-            if k.startswith('#') or k.startswith('_'):
+            if k[:1] in ('#', '_'):
                 continue
             if '.' not in k and type(v) is str and v.startswith('@') and k not in self._nodes:
                 self._add_node(k + v, dict())
@@ -50,20 +62,21 @@ class Scope:
     def _base(self) -> str:
         return self._conf['_base']
 
-    @property
+    # the following props are fixed after merging and cached on first access
+    @cached_property
     def _path(self) -> str:
         """base directory name of the scope"""
         return self._conf.get('_path', self._flow._conf.get('_path', self._name))
 
-    @property
+    @cached_property
     def _readonly(self) -> bool:
         return self._conf.get('_readonly', self._flow._readonly)
 
-    @property
+    @cached_property
     def _requires(self) -> Union[str, List[str]]:
         return self._conf.get('_requires', self._flow._requires)
 
-    @property
+    @cached_property
     def _base_dir(self) -> Path:
         """base directory of the scope"""
         return self._data_dir / self._path
@@ -102,7 +115,7 @@ class Scope:
         elif '_base' not in node_conf:
             node_conf['_base'] = node_name
 
-        if not re.match(r'^\w+$', node_name, re.ASCII):
+        if not _is_name(node_name):
             crumb = self._node_crumb(node_name)
             raise FlowError(f'{crumb}: invalid node name')
 
@@ -138,6 +151,7 @@ class Scope:
 
         node = Node(self._flux, self._flow, self, node_name, node_conf)
         self._nodes[node_name] = node
+        self._found_nodes.clear()
         setattr(self, node_name, node)
         return node
 
@@ -206,7 +220,7 @@ class Scope:
 
     def _find_scope(self, link) -> 'Scope':
         # search for scope in file
-        if re.match(r'^[^#]+#\w+$', link, re.ASCII):
+        if _FILE_SCOPE_RE.match(link):
             file, name = link.split('#')
 
             flow = self._flux.load_flow(file, relative_to=self._flow._file)
@@ -214,7 +228,7 @@ class Scope:
                 return flow._scopes[name]
 
         # search for scope in flow
-        elif re.match(r'^\w+$', link, re.ASCII):
+        elif _is_name(link):
             if link in self._flow._scopes:
                 return self._flow._scopes[link]
 
@@ -222,8 +236,17 @@ class Scope:
         raise ScopeNotFoundError(f'{crumb}: "{link}"')
 
     def _find_node(self, link) -> 'Node':
+        node = self._found_nodes.get(link)
+        if node is None:
+            node = self._lookup_node(link)
+            # base scopes (e.g. of other flows) may still get nodes while merging
+            if not self._flux.merging:
+                self._found_nodes[link] = node
+        return node
+
+    def _lookup_node(self, link) -> 'Node':
         # search for @foo#bar.1234ab
-        if re.match(r'^\w+#\w+\.[a-z0-9]{1,8}$', link, re.ASCII):
+        if _SLUG_LINK_RE.match(link):
             path, slug = link.split('#')
             conf_file = self._data_dir / path / f'{slug}.json'
             if conf_file.is_file():
@@ -236,7 +259,7 @@ class Scope:
                 raise FlowError(f'{conf_file} not found')
 
         # search for node in file
-        if re.match(r'^[^#]+#\w+\.\w+$', link, re.ASCII):
+        if _FILE_NODE_RE.match(link):
             file, step = link.split('#')
             scope_name, node_name = step.split('.')
 
@@ -246,7 +269,7 @@ class Scope:
                 return scope._find_node(node_name)
 
         # search for node in flow and base flows
-        if re.match(r'^\w+\.\w+$', link, re.ASCII):
+        if _SCOPE_NODE_RE.match(link):
             scope_name, node_name = link.split('.')
             flow, scope = self._flow, self
             while scope:
@@ -259,7 +282,7 @@ class Scope:
                 flow = scope._flow if scope else None
 
         # search for node in scope and base scopes
-        if re.match(r'^\w+$', link, re.ASCII):
+        if _is_name(link):
             scope = self
             node_name = link
             while scope:
@@ -1,9 +1,11 @@
 import collections
+import concurrent.futures as cf
 import os
 from pathlib import Path
 import re
 import shutil
-from typing import List, Optional, Union
+import stat
+from typing import List, Optional, Tuple, Union
 
 
 from flowfish import flow, TYPE_CHECKING
@@ -13,6 +15,25 @@ from flowfish.utils import humansize
 if TYPE_CHECKING:
     from flowfish.flow import Flow
 
+_FILE_RE = re.compile(r'^\w+\.[a-z0-9]+\.(data|data\.tmp|data\.mdb|data\.mdb\.tmp|json)$', re.ASCII)
+_LOCK_RE = re.compile(r'^\w+\.[a-z0-9]+\.lock$', re.ASCII)
+_SYNC_RE = re.compile(r'^\w+\.[a-z0-9]+\.sync$', re.ASCII)
+_SLUG_RE = re.compile(r'^\w+\.[a-z0-9]+$', re.ASCII)
+
+
+def _dir_stats(path: Path) -> Tuple[int, int]:
+    """count and size of all entries below path (symlinks are not followed)"""
+    count, size = 0, 0
+    stack = [str(path)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for e in it:
+                count += 1
+                size += e.stat(follow_symlinks=False).st_size
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+    return count, size
+
 
 def _find_files(data_dir: Path, flows, find_all: bool = False):
     slug_dirs = set()
@@ -33,56 +54,73 @@ def _find_files(data_dir: Path, flows, find_all: bool = False):
     data_files = collections.defaultdict(set)
     data_sizes, data_counts = dict(), dict()
 
-    file_pattern = re.compile(r'^\w+\.[a-z0-9]+\.(data|data\.tmp|data\.mdb|data\.mdb\.tmp|json)$', re.ASCII)
-    lock_pattern = re.compile(r'^\w+\.[a-z0-9]+\.lock$', re.ASCII)
-    sync_pattern = re.compile(r'^\w+\.[a-z0-9]+\.sync$', re.ASCII)
-    slug_pattern = re.compile(r'^\w+\.[a-z0-9]+$', re.ASCII)
+    def _scan(path: Path):
+        # directory entries with cached types (missing dirs are empty)
+        try:
+            with os.scandir(path) as it:
+                return list(it)
+        except (FileNotFoundError, NotADirectoryError):
+            return []
 
     for base_dir in base_dirs:
-        if base_dir.is_dir():
-            for f in base_dir.iterdir():
-                # find files
-                if f.is_file() and file_pattern.match(f.name):
-                    slug_dir = base_dir / f.stem
-                    if slug_dir not in slug_dirs:
-                        data_files[slug_dir].add(f)
-                # find dirs
-                elif f.is_dir() and slug_pattern.match(f.name):
-                    if f not in slug_dirs:
-                        data_files[f].add(f)
-
-            lock_dir = base_dir / '.lock'
-            if lock_dir.is_dir():
-                for f in lock_dir.iterdir():
-                    if f.is_file() and lock_pattern.match(f.name):
-                        slug_dir = base_dir / f.stem
-                        if slug_dir not in slug_dirs:
-                            data_files[slug_dir].add(f)
-
-            sync_dir = base_dir / '.sync'
-            if sync_dir.is_dir():
-                for f in sync_dir.iterdir():
-                    if f.is_file() and sync_pattern.match(f.name):
-                        slug_dir = base_dir / f.stem
-                        if slug_dir not in slug_dirs:
-                            data_files[slug_dir].add(f)
+        for e in _scan(base_dir):
+            # find files
+            if e.is_file() and _FILE_RE.match(e.name):
+                slug_dir = base_dir / os.path.splitext(e.name)[0]
+                if slug_dir not in slug_dirs:
+                    data_files[slug_dir].add(Path(e.path))
+            # find dirs
+            elif e.is_dir() and _SLUG_RE.match(e.name):
+                f = Path(e.path)
+                if f not in slug_dirs:
+                    data_files[f].add(f)
+
+        for e in _scan(base_dir / '.lock'):
+            if e.is_file() and _LOCK_RE.match(e.name):
+                slug_dir = base_dir / os.path.splitext(e.name)[0]
+                if slug_dir not in slug_dirs:
+                    data_files[slug_dir].add(Path(e.path))
+
+        for e in _scan(base_dir / '.sync'):
+            if e.is_file() and _SYNC_RE.match(e.name):
+                slug_dir = base_dir / os.path.splitext(e.name)[0]
+                if slug_dir not in slug_dirs:
+                    data_files[slug_dir].add(Path(e.path))
+
+    # stat all candidates at once, parallel calls overlap on network file systems
+    paths = [f for files in data_files.values() for f in files]
+    with cf.ThreadPoolExecutor() as pool:
+        lstats = dict(zip(paths, pool.map(os.lstat, paths)))
 
     # some stats
     for slug_dir, files in data_files.items():
         count, size = 0, 0
         for f in files:
             count += 1
-            size += f.lstat().st_size
-            if f.is_dir():
-                files = list(f.glob('**/*'))
-                count += len(files)
-                size += sum(f.lstat().st_size for f in files)
+            st = lstats[f]
+            size += st.st_size
+            if stat.S_ISDIR(st.st_mode) or stat.S_ISLNK(st.st_mode) and f.is_dir():
+                dir_count, dir_size = _dir_stats(f)
+                count += dir_count
+                size += dir_size
         data_counts[slug_dir] = count
         data_sizes[slug_dir] = size
 
     return data_files, data_counts, data_sizes
 
 
+def _remove(path: Path):
+    # unlink first, only dirs need a stat (files may be gone already)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        if not path.is_dir():
+            raise
+        shutil.rmtree(path, ignore_errors=True)
+
+
 def flow_prune(data_dir: Path,
                sync_dir: Optional[Path],
                conf_files: List[Union[str, Path]],
@@ -116,9 +154,6 @@ def flow_prune(data_dir: Path,
         for slug_dir, files in sorted(data_files.items()):
             print(f'- {slug_dir.relative_to(data_dir)} ({humansize(data_sizes[slug_dir])})')
             for f in files:
-                if f.is_file():
-                    os.remove(f)
-                elif f.is_dir():
-                    shutil.rmtree(f, ignore_errors=True)
+                _remove(f)
         print(f'{humansize(sum(data_sizes.values()))} in '
               f'{sum(data_counts.values()):,} unused file(s) in "{data_dir}" pruned')
@@ -1,36 +1,75 @@
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 import concurrent.futures as cf
+import copy
 import ctypes
+import functools
 import importlib
+import itertools
+import json
 import os
 from pathlib import Path
-import pkg_resources
-from pkg_resources import DistributionNotFound, VersionConflict
+import queue
 import shutil
-from threading import Lock, Thread
-from typing import Any, Callable, Dict, List, Optional, Union
+import sys
+from threading import local, Lock, Thread
+from typing import Any, Callable, Coroutine, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import warnings
 
-import murmurhash
+from murmurhash import hash as _murmur_hash
 from tqdm import tqdm
 
 from flowfish.exec import subprocess
 
+try:
+    from importlib import metadata as importlib_metadata
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:
+    # Python 3.7 or no packaging (use pkg_resources)
+    importlib_metadata = None  # type: ignore
+
+try:
+    from functools import cached_property
+except ImportError:
+    # Python 3.7
+    class cached_property:  # type: ignore
+        """compute attribute on first access (stored in instance dict)"""
+
+        def __init__(self, func):
+            self.func = func
+            self.__doc__ = func.__doc__
+
+        def __set_name__(self, owner, name):
+            self.name = name
+
+        def __get__(self, obj, cls=None):
+            if obj is None:
+                return self
+            value = obj.__dict__[self.name] = self.func(obj)
+            return value
+
 
 class LoopThread:
 
-    def __init__(self):
+    def __init__(self, loop_policy: Optional[asyncio.AbstractEventLoopPolicy] = None):
         self._lock = Lock()
         self._loop = None
+        self._loop_policy = loop_policy
 
     def loop(self):
         with self._lock:
             if not self._loop:
-                self._loop = asyncio.new_event_loop()
+                if self._loop_policy:
+                    self._loop = self._loop_policy.new_event_loop()
+                else:
+                    self._loop = asyncio.new_event_loop()
                 Thread(target=self._loop.run_forever, daemon=True).start()
             return self._loop
 
+    def submit(self, coro: Coroutine) -> 'cf.Future':
+        """run coroutine in thread's loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop())
+
     def stop(self):
         with self._lock:
             if self._loop:
@@ -40,8 +79,19 @@ class LoopThread:
         self.stop()
 
 
+_missing = object()
+
+
 def find_obj(name: str) -> Any:
     """find object"""
+    # fast path for objects of imported modules (plain dict lookups can not warn)
+    module_name, _, target_name = name.rpartition('.')
+    module = sys.modules.get(module_name) if module_name else None
+    if module is not None:
+        target = vars(module).get(target_name, _missing)
+        if target is not _missing:
+            return target
+
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore")
         segments = name.split('.')
@@ -85,18 +135,57 @@ def copy_props(source: Optional[Dict], target: Dict, prefixes: Optional[List[str
     if source:
         assert isinstance(source, dict), f'expect dict and not {type(source)}'
         assert isinstance(target, dict), f'expect dict and not {type(target)}'
+        if not prefixes:
+            if overwrite:
+                target.update(source)
+            else:
+                for k, v in source.items():
+                    target.setdefault(k, v)
+            return
         # [foo, bar] -> foo.bar.
-        prefix = '.'.join(prefixes) + '.' if prefixes else None
+        prefix = '.'.join(prefixes) + '.'
+        n = len(prefix)
         for k, v in source.items():
-            if not prefix:
-                if overwrite or k not in target:
-                    target[k] = v
-            elif k.startswith(prefix):
-                k = k[len(prefix):]
+            if k.startswith(prefix):
+                k = k[n:]
                 if overwrite or k not in target:
                     target[k] = v
 
 
+def clone_conf(conf: Any) -> Any:
+    """deep copy conf (much faster than copy.deepcopy for JSON like confs)"""
+    t = type(conf)
+    if t is dict:
+        return dict((k, clone_conf(v)) for k, v in conf.items())
+    elif t is list:
+        return [clone_conf(v) for v in conf]
+    elif t is tuple:
+        return tuple(clone_conf(v) for v in conf)
+    elif t in (str, int, float, bool) or conf is None:
+        return conf
+    # objects are copied as before
+    return copy.deepcopy(conf)
+
+
+def canon_json(v):
+    """normalize value like a JSON round-trip (e.g. tuples become lists, objects become None)"""
+    if isinstance(v, (str, int, float)) or v is None:
+        return v
+    elif isinstance(v, dict):
+        return dict((_canon_key(k), canon_json(v_)) for k, v_ in v.items())
+    elif isinstance(v, (list, tuple)):
+        return [canon_json(v_) for v_ in v]
+    return None
+
+
+def _canon_key(k):
+    if isinstance(k, str):
+        return k
+    elif isinstance(k, (int, float)) or k is None:
+        return json.dumps(k)
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(k).__name__}')
+
+
 def fake_hash(obj) -> str:
     """use object identity as fake hash"""
     return format(id(obj) & (1 << 32)-1, 'x')
@@ -104,48 +193,134 @@ def fake_hash(obj) -> str:
 
 def hash32(dump: Union[bytes, str]) -> str:
     """Creates a 32-bit hash from bytes or string"""
-    return format(murmurhash.hash(dump) & (1 << 32)-1, 'x')
+    return f'{_murmur_hash(dump) & 0xffffffff:x}'
 
 
 def copy_file(src: Path, dst: Path):
-    if not src.is_file():
-        raise FileNotFoundError(src)
-
-    if dst.is_file():
-        src_size = src.lstat().st_size
-        dst_size = src.lstat().st_size
-        modified = src_size != dst_size
-    else:
-        modified = True
-
-    if modified:
-        os.makedirs(dst.parent, exist_ok=True)
+    try:
         try:
             # create hard link
             os.link(src, dst)
-            # update modified time
-            os.utime(dst)
-        except OSError:
-            tmp = dst.with_name(dst.name + '.tmp')
-            shutil.copy(src, tmp)
-            os.rename(tmp, dst)
+        except FileNotFoundError:
+            if not src.is_file():
+                raise FileNotFoundError(src)
+            # create missing dst dir only on demand
+            os.makedirs(dst.parent, exist_ok=True)
+            os.link(src, dst)
+        # update modified time
+        os.utime(dst)
+    except FileExistsError:
+        # keep files of same size, replace others (e.g. changed on push or pull)
+        if src.lstat().st_size != dst.lstat().st_size:
+            _copy_tmp(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        if not src.is_file():
+            raise FileNotFoundError(src)
+        _copy_tmp(src, dst)
+
+
+def _copy_tmp(src: Path, dst: Path):
+    # copy to temp file and replace dst at once
+    tmp = dst.with_name(dst.name + '.tmp')
+    try:
+        _copy_file_range(src, tmp)
+    except OSError:
+        shutil.copy(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _copy_file_range(src: Path, dst: Path):
+    # copy within the kernel (linux only, python 3.8+)
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError('copy_file_range not available')
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        while size > 0:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size)
+            if n == 0:
+                break
+            size -= n
+    shutil.copymode(src, dst)
+
+
+def copy_files(files: Iterable[Tuple[Path, Path]]):
+    """copy (src, dst) pairs of files in parallel"""
+    with cf.ThreadPoolExecutor() as pool:
+        # consume results to raise errors
+        for _ in pool.map(lambda f: copy_file(*f), files):
+            pass
+
+
+def walk_files(root: Path) -> Iterator[Path]:
+    """files below root (like root.glob('**/*') but with cached entry types)"""
+    stack = [str(root)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        dirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.path)
+            elif entry.is_file():
+                yield Path(entry.path)
+        # keep scan order of sub directories
+        stack.extend(reversed(dirs))
+
+
+# requirements known to be installed (never uninstalled while running)
+_installed_pkgs: Set[str] = set()
 
 
 def resolve_packages(*requirements: str) -> List[str]:
     missing_pkgs = []
     for p in requirements:
-        try:
-            dist = pkg_resources.get_distribution(p)
-        except (DistributionNotFound, VersionConflict):
-            dist = None
-        # double check if package really exists
-        if dist is None or hasattr(dist, 'egg_info') and not os.path.exists(getattr(dist, 'egg_info')):
+        if p in _installed_pkgs:
+            continue
+        if _installed(p):
+            _installed_pkgs.add(p)
+        else:
             missing_pkgs.append(p)
     return missing_pkgs
 
 
+def _installed(requirement: str) -> bool:
+    if importlib_metadata is not None:
+        try:
+            req = Requirement(requirement)
+        except InvalidRequirement:
+            req = None
+        if req is not None and not req.url:
+            version = _dist_version(req.name)
+            if version is None:
+                return False
+            return req.specifier.contains(version, prereleases=True)
+
+    import pkg_resources
+    try:
+        dist = pkg_resources.get_distribution(requirement)
+    except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict):
+        return False
+    # double check if package really exists
+    return not (hasattr(dist, 'egg_info') and not os.path.exists(getattr(dist, 'egg_info')))
+
+
+@functools.lru_cache(maxsize=None)
+def _dist_version(name: str) -> Optional[str]:
+    # lookup only this distribution (scanning all is slower for a few requirements)
+    try:
+        return importlib_metadata.version(name)
+    except importlib_metadata.PackageNotFoundError:
+        return None
+
+
 def pip_install(*requirements: str):
     ret = subprocess('pip', 'install', '-q', *requirements)
+    # installed versions have changed
+    _dist_version.cache_clear()
     if ret != 0:
         raise Exception(f'pip install for {requirements} failed with {ret}')
 
@@ -172,46 +347,83 @@ def pool_run(tasks: Dict[Callable, Optional[Union[Callable, List[Callable]]]]):
     tasks.update((v, None) for v in list(filter(None, tasks.values()))
                  for v in v if v not in tasks)  # type: ignore
 
+    # count open deps and index dependents once (instead of scanning all tasks per result)
+    indeg = dict((k, len(v) if v else 0) for k, v in tasks.items())
+    dependents = defaultdict(list)
+    for k, v in tasks.items():
+        for d in v or ():
+            dependents[d].append(k)
+    ready = deque(k for k, n in indeg.items() if n == 0)
+
     futures = dict()
     results = defaultdict(list)
+    # completed futures are queued by callback (no rescan of pending futures)
+    completed = queue.SimpleQueue()  # type: ignore
 
-    pool = cf.ThreadPoolExecutor()
+    # nested runs (called by a task) get their own pool, else they could wait for busy workers forever
+    shared = not getattr(_pool_local, 'worker', False)
+    pool = _shared_pool() if shared else cf.ThreadPoolExecutor(initializer=_init_worker)
     try:
         try:
-            while futures or tasks:
-                for k, v in dict(tasks).items():
-                    if not v:
-                        # submit tasks with no deps
-                        futures[pool.submit(k, results[k])] = k
-                        del tasks[k]
-                done, pending = cf.wait(futures, return_when=cf.FIRST_COMPLETED)
-                for f in done:
-                    e = f.exception()
-                    if e:
-                        raise e
-                    r = f.result()
-                    yield r
-
-                    # remove future
-                    k = futures[f]
-                    del futures[f]
-                    # remove results
-                    del results[k]
-
-                    # remove task from deps
-                    for k_, v in tasks.items():
-                        if v is not None and k in v:
-                            # add result to deps
-                            results[k_].append(r)
-                            v.remove(k)
+            while futures or ready:
+                while ready:
+                    # submit tasks with no deps
+                    k = ready.popleft()
+                    f = pool.submit(k, results.pop(k, []))
+                    futures[f] = k
+                    f.add_done_callback(completed.put)
+                f = completed.get()
+                e = f.exception()
+                if e:
+                    raise e
+                r = f.result()
+                yield r
+
+                # remove future
+                k = futures.pop(f)
+
+                # add result to dependents
+                for k_ in dependents.pop(k, ()):
+                    results[k_].append(r)
+                    indeg[k_] -= 1
+                    if indeg[k_] == 0:
+                        ready.append(k_)
         finally:
-            pool.shutdown(wait=False)
+            if not shared:
+                pool.shutdown(wait=False)
     except KeyboardInterrupt as e:
-        if pool:
-            try:
-                kill_pool(pool)
-            finally:
-                raise e
+        try:
+            kill_pool(pool)
+        finally:
+            if shared:
+                _reset_shared_pool(pool)
+            raise e
+
+
+_pool: Optional[cf.ThreadPoolExecutor] = None
+_pool_lock = Lock()
+_pool_local = local()
+
+
+def _init_worker():
+    _pool_local.worker = True
+
+
+def _shared_pool() -> cf.ThreadPoolExecutor:
+    # reuse worker threads across runs
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = cf.ThreadPoolExecutor(initializer=_init_worker)
+        return _pool
+
+
+def _reset_shared_pool(pool: cf.ThreadPoolExecutor):
+    # replace killed pool on next run
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
 
 
 def kill_pool(pool: cf.Executor):
@@ -234,6 +446,10 @@ def kill_thread(thread):
         raise SystemError('PyThreadState_SetAsyncExc failed')
 
 
+_TIME_UNITS = (('y', 31536000), ('w', 604800), ('d', 86400), ('h', 3600), ('m', 60), ('s', 1))
+_SIZE_UNITS = ('b', 'k', 'M', 'G', 'T')
+
+
 def humantime(t: float) -> str:
     """Formats time into a compact human readable format
 
@@ -242,18 +458,17 @@ def humantime(t: float) -> str:
     t : float
         number of seconds
     """
-    times = {}
-    units = {'y': 31536000, 'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
-    for i, (unit, seconds) in enumerate(units.items()):
-        if t // seconds > 0:
-            times[unit] = int(t//seconds)
-            t -= t//seconds * seconds
-    if not times:
-        if int(t * 1000) > 0:
-            times['ms'] = int(t * 1000)
-        else:
-            return '0s'
-    return ''.join(f'{v}{u}' for u, v in times.items())
+    # e.g. negative durations after clock adjustments
+    t = max(t, 0)
+    parts = []
+    for unit, seconds in _TIME_UNITS:
+        q, t = divmod(t, seconds)
+        if q > 0:
+            parts.append(f'{int(q)}{unit}')
+    if parts:
+        return ''.join(parts)
+    ms = int(t * 1000)
+    return f'{ms}ms' if ms > 0 else '0s'
 
 
 def humansize(s: int) -> str:
@@ -264,15 +479,11 @@ def humansize(s: int) -> str:
     s : int
         number of bytes
     """
-    sizes = {}
-    units = {'T': 0x10000000000, 'G': 0x40000000, 'M': 0x100000, 'k': 0x400, 'b': 1}
-    for i, (unit, size) in enumerate(units.items()):
-        if s // size > 0:
-            sizes[unit] = s/size
-            s -= s//size * size
-    if 'b' not in sizes:
+    if s < 1:
         return '0b'
-    u, v = max(sizes.items(), key=lambda i: i[1]*units[i[0]])
+    # the largest unit is the number of whole 10 bit steps
+    i = min((int(s).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    u, v = _SIZE_UNITS[i], s / (1 << (10 * i))
     return f'{int(v)}{u}' if int(v) == v else f'{v:.2f}{u}'
 
 
@@ -280,19 +491,27 @@ def expand_path(path: str):
     return os.path.expandvars(os.path.expanduser(path))
 
 
+_IO_BUFFER_SIZE = 1 << 20
+_WRITE_CHUNK_LINES = 1024
+
+
 def readlines(path, binary=False, skip_rows=0):
     path = expand_path(path)
-    with open(path, mode='rb' if binary else 'r', encoding=None if binary else 'utf-8') as f:
-        for i, line in enumerate(f):
-            if i >= skip_rows:
-                yield line.rstrip()
+    with open(path, mode='rb' if binary else 'r', encoding=None if binary else 'utf-8', buffering=_IO_BUFFER_SIZE) as f:
+        # strip lines in C (map) instead of per line in python
+        yield from map(bytes.rstrip if binary else str.rstrip, itertools.islice(f, max(skip_rows, 0), None))
 
 
 def writelines(lines, path, binary=False):
     path = expand_path(path)
     os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-    with open(path, mode='wb' if binary else 'w', encoding=None if binary else 'utf-8') as f:
-        for i, line in enumerate(lines):
-            if (i > 0):
-                f.write(b'\n' if binary else '\n')
-            f.write(line)
+    sep = b'\n' if binary else '\n'
+    lines = iter(lines)
+    with open(path, mode='wb' if binary else 'w', encoding=None if binary else 'utf-8', buffering=_IO_BUFFER_SIZE) as f:
+        # write joined chunks of lines instead of each line and newline
+        chunk = list(itertools.islice(lines, _WRITE_CHUNK_LINES))
+        while chunk:
+            f.write(sep.join(chunk))
+            chunk = list(itertools.islice(lines, _WRITE_CHUNK_LINES))
+            if chunk:
+                f.write(sep)
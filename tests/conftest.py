@@ -1,4 +1,3 @@
-import os
 import pytest
 
 
@@ -8,5 +7,5 @@ def anyio_backend():
 
 
 @pytest.fixture(autouse=True)
-def temp_flow_data_dir(monkeypatch, tmpdir):
-    monkeypatch.setenv('FLOW_DATA_DIR', os.path.join(tmpdir, 'flow'))
+def temp_flow_data_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv('FLOW_DATA_DIR', str(tmp_path / 'flow'))
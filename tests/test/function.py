@@ -30,6 +30,15 @@ def analyzer(tokenize, input):
     return tokenize(input)
 
 
+def append(items):
+    items.append(0)
+    return items
+
+
+def call_twice(func):
+    return func(), func()
+
+
 def numbers():
     for i in range(10):
         yield i
@@ -62,7 +62,7 @@ def test_assign_map_ref():
     assert f.test.target() == {'color': 'red'}
 
 
-def test_assign_path_dotonly(tmpdir):
+def test_assign_path_dotonly(tmp_path):
     f = flow({
         'test': {
             'source@map': {
@@ -72,12 +72,12 @@ def test_assign_path_dotonly(tmpdir):
                 'color': '@source/.'
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert f.test.target() == {'color': f'{f.test.source._work_dir}/red'}
 
 
-def test_assign_path_map(tmpdir):
+def test_assign_path_map(tmp_path):
     f = flow({
         'test': {
             'source@dict': {
@@ -87,6 +87,6 @@ def test_assign_path_map(tmpdir):
                 'color': '@source/.:input.color'
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert f.test.target() == {'color': f'{f.test.source._work_dir}/red'}
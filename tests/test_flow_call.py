@@ -19,8 +19,10 @@ def test_call_required_args_failure():
     assert str(excinfo.value.__cause__) == "test.function.foo() is missing arguments: ['b']"
 
 
-def test_call_required_args():
-    f = flow({
+@pytest.fixture
+def foo_flow():
+    # a fresh flow per test (cached node results must not leak between tests)
+    return flow({
         'test': {
             'foo@test.function.foo': {
                 'a': 'a',
@@ -29,20 +31,20 @@ def test_call_required_args():
             }
         }
     })
-    assert f.test.foo() == ('a', 'b', (), 'd', None, {})
 
 
-def test_call_required_args_override():
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'd': 'd'
-            }
-        }
-    })
-    assert f.test.foo('A', 'B') == ('A', 'B', (), 'd', None, {})
+@pytest.mark.parametrize('args,kwargs,expected', [
+    # required args
+    ((), {}, ('a', 'b', (), 'd', None, {})),
+    (('A', 'B'), {}, ('A', 'B', (), 'd', None, {})),
+    # varargs
+    (('A', 'B', 'C', 'C'), {}, ('A', 'B', ('C', 'C'), 'd', None, {})),
+    (('A', 'B'), {'c': ('C', 'C')}, ('A', 'B', ('C', 'C'), 'd', None, {})),
+    # posargs are prefered over kwargs: test.foo(*args, *{**conf, **kwargs})
+    (('A', 'B', 'Z', 'Z'), {'c': ('C', 'C')}, ('A', 'B', ('Z', 'Z'), 'd', None, {})),
+])
+def test_call_args(foo_flow, args, kwargs, expected):
+    assert foo_flow.test.foo(*args, **kwargs) == expected
 
 
 def test_call_varargs_failure():
@@ -76,47 +78,6 @@ def test_call_varargs():
     assert f.test.foo() == ('a', 'b', ('c', 'c'), 'd', None, {})
 
 
-def test_call_varargs_override_posargs():
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'd': 'd'
-            }
-        }
-    })
-    assert f.test.foo('A', 'B', 'C', 'C') == ('A', 'B', ('C', 'C'), 'd', None, {})
-
-
-def test_call_varargs_override_kwargs():
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'd': 'd'
-            }
-        }
-    })
-    assert f.test.foo('A', 'B', c=('C', 'C')) == ('A', 'B', ('C', 'C'), 'd', None, {})
-
-
-def test_call_varargs_override_posargs_and_kwargs():
-    # posargs are prefered over kwargs:
-    # test.foo(*args, *{**conf, **kwargs})
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'd': 'd'
-            }
-        }
-    })
-    assert f.test.foo('A', 'B', 'Z', 'Z', c=('C', 'C')) == ('A', 'B', ('Z', 'Z'), 'd', None, {})
-
-
 def test_call_underscore_args():
     # underscore args can only be used if they are already valid function args,
     # underscore args in **kwargs are not supported
@@ -145,3 +106,19 @@ def test_call_byref():
     })
 
     assert f.test.analyzer() == ['hello', 'world']
+
+
+def test_call_byref_modified_args():
+    # each call of a reference must get fresh args
+    f = flow({
+        'test': {
+            'append@test.function.append': {
+                'items': [0]
+            },
+            'call_twice@test.function.call_twice': {
+                'func': '&append'
+            }
+        }
+    })
+
+    assert f.test.call_twice() == ([0, 0], [0, 0])
@@ -0,0 +1,12 @@
+# type: ignore
+import io
+
+from flowfish.exec import subprocess
+
+
+def test_subprocess_early_exit():
+    # process exits before reading all of its input
+    stdout = io.BytesIO()
+    stdin = io.BytesIO(b'x' * (50 << 20))
+    assert subprocess('head', '-c', '1', stdin=stdin, stdout=stdout, stderr=io.BytesIO()) == 0
+    assert stdout.getvalue() == b'x'
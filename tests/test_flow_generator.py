@@ -2,20 +2,20 @@
 from flowfish import flow
 
 
-def test_call_generator(tmpdir):
+def test_call_generator(tmp_path):
     f = flow({
         'test': {
             'numbers@test.function.numbers': {
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert list(f.test.numbers()) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
     # the numbers generator should not be exhausted if called a second time
     assert list(f.test.numbers()) == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
 
 
-def test_call_generator_multiple_times(tmpdir):
+def test_call_generator_multiple_times(tmp_path):
     f = flow({
         'test': {
             'numbers@test.function.numbers': {
@@ -33,12 +33,12 @@ def test_call_generator_multiple_times(tmpdir):
                 'value': '[foo, bar]'
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert f.test.foobar() == [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]]
 
 
-def test_call_generator_multiple_times_async(tmpdir):
+def test_call_generator_multiple_times_async(tmp_path):
     f = flow({
         'test': {
             'numbers@test.function.numbers_async': {
@@ -56,6 +56,6 @@ def test_call_generator_multiple_times_async(tmpdir):
                 'value': '[foo, bar]'
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert f.test.foobar() == [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]]
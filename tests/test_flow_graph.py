@@ -1,10 +1,15 @@
 # type: ignore
+import io
 import re
 from flowfish import flow
+from flowfish.graph import dot_stream
+
+
+_WS_RE = re.compile(r'\s+')
 
 
 def strip_chars(s: str):
-    return re.sub(r'\s+', '', s)
+    return _WS_RE.sub('', s)
 
 
 def test_dot():
@@ -39,3 +44,39 @@ def test_dot():
         }
         """
     )
+
+
+def test_dot_stream():
+    f = flow({
+        'test': {
+            'a@dict': {
+                '_dump': True
+            },
+            'b@dict': {
+                'a': '@a'
+            }
+        },
+        'other': {
+            'c@dict': {
+                'b': '&test.b'
+            }
+        }
+    })
+
+    fp = io.StringIO()
+    dot_stream(fp, f._flux.graph, f.test.b, direction=0)
+    assert fp.getvalue() == f.test.b.dot(direction=0).source
+
+
+def test_link_repr_working_dir(tmp_path, monkeypatch):
+    # inter-flow links are shown relative to the working dir
+    (tmp_path / 'a.json').write_text('{"a": {"x@dict": {}}}')
+    (tmp_path / 'b.json').write_text('{"b": {"y@dict": {"x": "@a.json#a.x"}}}')
+    (tmp_path / 'sub').mkdir()
+    monkeypatch.chdir(tmp_path)
+    f = flow('b.json')
+    node = f.b.y
+    link, = node._flux.graph._incoming[node]
+    assert repr(link) == '@a.json#a.x'
+    monkeypatch.chdir(tmp_path / 'sub')
+    assert repr(link) == f'@{tmp_path}/a.json#a.x'
@@ -1,10 +1,10 @@
 # type: ignore
-import pkg_resources
+import os
 
 from flowfish import flow
 
 
-BASE_DIR = pkg_resources.resource_filename(__name__, 'data/')
+BASE_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
 
 def test_multiconf():
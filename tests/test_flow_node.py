@@ -1,12 +1,16 @@
 # type: ignore
 import json
 import pickle
+import pytest
+from collections import OrderedDict
+
 from flowfish import flow
 
 
-def test_node_conf():
-    # conf must contain metadata and additional function defaults
-    f = flow({
+# flows of tests which only inspect nodes (without calling them)
+@pytest.fixture(scope='module')
+def foo_flow(tmp_path_factory):
+    return flow({
         'test': {
             'foo@test.function.foo': {
                 'a': 'a',
@@ -14,8 +18,26 @@ def test_node_conf():
                 'd': 'd'
             }
         }
-    })
-    assert f.test.foo.conf == {'test': {'foo': {
+    }, data_dir=tmp_path_factory.mktemp('flow'))
+
+
+@pytest.fixture(scope='module')
+def foo_flow_ef(tmp_path_factory):
+    return flow({
+        'test': {
+            'foo@test.function.foo': {
+                'a': 'a',
+                'b': 'b',
+                'e': 'e',
+                'f': 'f'
+            }
+        }
+    }, data_dir=tmp_path_factory.mktemp('flow'))
+
+
+def test_node_conf(foo_flow):
+    # conf must contain metadata and additional function defaults
+    assert foo_flow.test.foo.conf == {'test': {'foo': {
         '_base': 'foo',
         '_func': 'test.function.foo',
         '_hash': '6c9cc6b0',
@@ -24,36 +46,62 @@ def test_node_conf():
     }}}
 
 
-def test_node_args():
+def test_node_args(foo_flow):
+    # hash conf my not contain metadate
+    assert foo_flow.test.foo.args == {
+        'a': 'a', 'b': 'b', 'd': 'd'
+    }
+
+
+def test_node_hash_conf(foo_flow):
     # hash conf my not contain metadate
+    assert foo_flow.test.foo._hash_conf == {'foo': {
+        'a': 'a', 'b': 'b', 'd': 'd', 'e': None
+    }}
+
+
+def test_node_hash_object():
+    # objects are hashed from their pickle dump (and the hash must stay stable)
     f = flow({
         'test': {
             'foo@test.function.foo': {
-                'a': 'a',
+                'a': OrderedDict,
                 'b': 'b',
                 'd': 'd'
             }
         }
     })
-    assert f.test.foo.args == {
-        'a': 'a', 'b': 'b', 'd': 'd'
-    }
+    assert f.test.foo._slug == 'foo.afc25df2'
 
 
-def test_node_hash_conf():
-    # hash conf my not contain metadate
-    f = flow({
+def test_node_hash_dynamic_function():
+    # functions pickled by value must be rehashed (their dump contains the globals they use)
+    ns = dict(K=1)
+    exec('def get_k():\n    return K', ns)
+    conf = {
         'test': {
             'foo@test.function.foo': {
-                'a': 'a',
+                'a': ns['get_k'],
                 'b': 'b',
                 'd': 'd'
             }
         }
-    })
-    assert f.test.foo._hash_conf == {'foo': {
-        'a': 'a', 'b': 'b', 'd': 'd', 'e': None
-    }}
+    }
+    slug = flow(conf).test.foo._slug
+    ns['K'] = 2
+    assert flow(conf).test.foo._slug != slug
+
+
+def test_node_hash_invalid():
+    # hash must be a 32-bit hex string (and nothing more)
+    with pytest.raises(ValueError):
+        flow({
+            'test': {
+                'foo@dict': {
+                    '_hash': '6c9cc6b0/..'
+                }
+            }
+        })
 
 
 def test_node_conf_pos_only():
@@ -71,44 +119,22 @@ def test_node_conf_pos_only():
     }}}
 
 
-def test_node_signature():
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'e': 'e',
-                'f': 'f'
-            }
-        }
-    })
-
-    assert str(f.test.foo.__signature__) == "(a='a', b='b', *c, d, e='e', f='f', **kwargs)"
-
+def test_node_signature(foo_flow_ef):
+    assert str(foo_flow_ef.test.foo.__signature__) == "(a='a', b='b', *c, d, e='e', f='f', **kwargs)"
 
-def test_node_doc():
-    f = flow({
-        'test': {
-            'foo@test.function.foo': {
-                'a': 'a',
-                'b': 'b',
-                'e': 'e',
-                'f': 'f'
-            }
-        }
-    })
 
-    assert str(f.test.foo.__doc__) == "I am foo"
+def test_node_doc(foo_flow_ef):
+    assert str(foo_flow_ef.test.foo.__doc__) == "I am foo"
 
 
-def test_node_dump(tmpdir):
+def test_node_dump(tmp_path):
     f = flow({
         'test': {
             'foobar@test.function.foobar': {
                 '_dump': True
             }
         }
-    }, data_dir=tmpdir)
+    }, data_dir=tmp_path)
 
     assert f.test.foobar() == "foobar"
     assert f.test.foobar.data == "foobar"
@@ -117,7 +143,6 @@ def test_node_dump(tmpdir):
     assert f.test.foobar._done
     assert f.test.foobar._data_file.is_file()
     assert f.test.foobar._conf_file.is_file()
-    with open(f.test.foobar._data_file, mode='rb') as fp:
-        assert pickle.load(fp) == "foobar"
-    with open(f.test.foobar._conf_file, mode='r') as fp:
-        assert json.load(fp) == f.test.foobar.conf
+    # check the dumped files (not only the cached value)
+    assert pickle.loads(f.test.foobar._data_file.read_bytes()) == "foobar"
+    assert json.loads(f.test.foobar._conf_file.read_bytes()) == f.test.foobar.conf
@@ -1,32 +1,66 @@
-import time
+import threading
 
 from flowfish.utils import pool_run
 
 
+class VirtualClock:
+    """clock for tasks of pool_run which advances when all runnable tasks sleep"""
+
+    def __init__(self, deps):
+        self.now = 0.0
+        self._cond = threading.Condition()
+        self._deps = dict((k, set(v or ())) for k, v in deps.items())
+        self._done = set()
+        self._wakes = []
+
+    def _runnable(self):
+        # tasks with all deps done are running (or about to run)
+        return sum(1 for k, v in self._deps.items() if k not in self._done and v <= self._done)
+
+    def sleep(self, t):
+        with self._cond:
+            wake = self.now + t
+            self._wakes.append(wake)
+            self._cond.notify_all()
+            while self.now < wake:
+                # advance to next wake if all runnable tasks sleep (and none is waking up)
+                if len(self._wakes) == self._runnable() and min(self._wakes) > self.now:
+                    self.now = min(self._wakes)
+                    self._cond.notify_all()
+                else:
+                    assert self._cond.wait(timeout=10), 'clock stalled'
+            self._wakes.remove(wake)
+
+    def done(self, task):
+        with self._cond:
+            self._done.add(task)
+            self._cond.notify_all()
+
+
 def test_pool_run_timing():
 
     def a(args):
-        time.sleep(0.1)
+        clock.sleep(0.1)
         return 'a'
 
     def aa(args):
-        time.sleep(0.2)
+        clock.sleep(0.2)
         return 'aa'
 
     def ab(args):
-        time.sleep(0.3)
+        clock.sleep(0.3)
         return 'ab'
 
     def aba(args):
-        time.sleep(0.4)
+        clock.sleep(0.4)
         return 'aba'
 
     def b(args):
-        time.sleep(0.5)
+        clock.sleep(0.5)
         return 'b'
 
     def c(args):
-        time.sleep(0.6)
+        clock.sleep(0.6)
         return 'c'
 
     deps = {
@@ -36,7 +70,12 @@ def test_pool_run_timing():
         c: None
     }
 
-    start = time.time()
-    assert [
-        (r, int(10*(time.time()-start))/10) for r in pool_run(deps)
-    ] == [('aa', 0.2), ('aba', 0.4), ('b', 0.5), ('c', 0.6), ('ab', 0.7), ('a', 0.8)]
+    tasks = dict((f.__name__, f) for f in (a, aa, ab, aba, b, c))
+    clock = VirtualClock(dict((f, [deps[f]] if callable(deps.get(f)) else deps.get(f)) for f in tasks.values()))
+
+    timings = []
+    for r in pool_run(deps):
+        # results are done when received (dependents start afterwards)
+        timings.append((r, round(clock.now, 1)))
+        clock.done(tasks[r])
+    assert timings == [('aa', 0.2), ('aba', 0.4), ('b', 0.5), ('c', 0.6), ('ab', 0.7), ('a', 0.8)]
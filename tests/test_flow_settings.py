@@ -0,0 +1,36 @@
+# type: ignore
+import sys
+
+import pytest
+
+from flowfish import _load_settings
+from flowfish.__main__ import main
+
+
+FLOWCONFIG = '''
+[DEFAULT]
+root = /srv/flow
+
+[flow]
+Data_Dir = %(root)s/data
+sync_dir: %(root)s/sync
+'''
+
+
+def test_settings_flowconfig(tmp_path, monkeypatch):
+    # defaults, interpolation, ":" separators and case-folded keys of ConfigParser
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.flowconfig').write_text(FLOWCONFIG)
+    settings = _load_settings()
+    assert settings['data_dir'] == '/srv/flow/data'
+    assert settings['sync_dir'] == '/srv/flow/sync'
+
+
+def test_main_flowconfig(tmp_path, monkeypatch, capsys):
+    # the command line reads .flowconfig of the working dir too
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / '.flowconfig').write_text(FLOWCONFIG)
+    monkeypatch.setattr(sys, 'argv', ['flow', 'run', '-h'])
+    with pytest.raises(SystemExit):
+        main()
+    assert '/srv/flow/data' in capsys.readouterr().out
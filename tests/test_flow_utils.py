@@ -0,0 +1,54 @@
+# type: ignore
+import pytest
+
+from flowfish.utils import copy_file, find_obj, humansize, humantime
+
+
+@pytest.mark.parametrize('t, expected', [
+    (-0.5, '0s'),
+    (0, '0s'),
+    (0.5, '500ms'),
+    (61, '1m1s'),
+    (90061.5, '1d1h1m1s'),
+])
+def test_humantime(t, expected):
+    assert humantime(t) == expected
+
+
+@pytest.mark.parametrize('s, expected', [
+    (0, '0b'),
+    (1023, '1023b'),
+    (1024, '1k'),
+    (1536, '1.50k'),
+    (1024**2 - 1, '1024.00k'),
+    (1024**2, '1M'),
+    (1024**4, '1T'),
+])
+def test_humansize(s, expected):
+    assert humansize(s) == expected
+
+
+def test_find_obj_reassigned(monkeypatch):
+    # module attributes may be reassigned (e.g. monkeypatched)
+    import test.function
+    assert find_obj('test.function.foobar')() == 'foobar'
+    monkeypatch.setattr(test.function, 'foobar', lambda: 'patched')
+    assert find_obj('test.function.foobar')() == 'patched'
+
+
+def test_copy_file_existing(tmp_path):
+    src = tmp_path / 'src'
+    src.write_bytes(b'new data')
+    # files of same size are kept (and not copied again)
+    dst = tmp_path / 'same' / 'dst'
+    dst.parent.mkdir()
+    dst.write_bytes(b'old data')
+    copy_file(src, dst)
+    assert dst.read_bytes() == b'old data'
+    # files of different size are replaced
+    dst.write_bytes(b'old')
+    copy_file(src, dst)
+    assert dst.read_bytes() == b'new data'
+    # missing dirs are created
+    copy_file(src, tmp_path / 'new' / 'dst')
+    assert (tmp_path / 'new' / 'dst').read_bytes() == b'new data'